@@ -2,20 +2,75 @@ import time
 import random
 import json
 import schedule
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
-import openai
-import sys
-import io
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 import logging
+from cancellation import CancelToken
+from metrics import PHASE_SECONDS, timed
+from selector_engine import ENGINE as SELECTORS
+from text_input import insert_text
+from driver_factory import acquire_driver, release_task_driver
+from session_store import restore_session, save_session
+from llm_client import get_client
+from draft_buffer import default_buffer
+from dedup_index import default_index
+from text_normalizer import normalize
+import linkedin_urls
+from logging_setup import configure_logging
+
+START_POST_SELECTORS = [
+    "//button[contains(@class, 'artdeco-button') and contains(., 'Start a post')]",
+    "//span[text()='Start a post']/parent::button",
+    "//button[contains(text(), 'Start a post')]",
+    "//*[contains(@class, 'share-box-feed-entry__trigger')]",
+    "//div[contains(@class, 'share-box-feed-entry__closed-share-box')]"
+]
+
+TEXT_AREA_SELECTORS = [
+    "//div[@data-placeholder='What do you want to talk about?']",
+    "//div[contains(@class, 'ql-editor')]",
+    "//div[@role='textbox']",
+    "//div[@contenteditable='true']"
+]
+
+POST_BUTTON_SELECTORS = [
+    "//button[contains(@class, 'share-actions-primary-button') and .//span[text()='Post']]",
+    "//button[.//span[text()='Post']]",
+    "//button[contains(@data-control-name, 'share.post')]",
+    "//button[text()='Post']"
+]
+
+POST_TOAST_SELECTORS = [
+    "//*[contains(@class, 'artdeco-toast-item')]",
+    "//*[@role='alert' and contains(., 'Post successful')]"
+]
+
+
+def _has_focus(driver, element):
+    return driver.execute_script(
+        "return arguments[0] === document.activeElement || arguments[0].contains(document.activeElement)", element)
+
+
+def _enclosing_dialog(element):
+    dialogs = element.find_elements(By.XPATH, "./ancestor::*[@role='dialog'][1]")
+    return dialogs[0] if dialogs else None
+
+
+def _modal_closed(modal):
+    if modal is None:
+        return False
+    try:
+        return not modal.is_displayed()
+    except StaleElementReferenceException:
+        return True
 
 class LinkedInAgent:
-    def __init__(self, email, password, openai_api_key=None):
+    def __init__(self, email, password, openai_api_key=None, cancel_token=None, base_url=None):
         """
         Initialize LinkedIn Agent
         
@@ -23,23 +78,20 @@ class LinkedInAgent:
             email: LinkedIn email
             password: LinkedIn password  
             openai_api_key: OpenAI API key for content generation (optional)
+            cancel_token: CancelToken checked between steps (optional)
+            base_url: site root, e.g. a local fixture server (default: LINKEDIN_BASE_URL or linkedin.com)
         """
         self.email = email
         self.password = password
         self.openai_api_key = openai_api_key
+        self.cancel_token = cancel_token or CancelToken()
+        self.base_url = base_url or linkedin_urls.base_url()
         self.driver = None
         self.wait = None
         
-        # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('linkedin_agent.log', encoding='utf-8'),
-                logging.StreamHandler(io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace'))
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        # Setup logging (shared, queue-based; no-op after the first call)
+        configure_logging()
+        self.logger = logging.getLogger("linkedin_agent")
         
         # Content templates for different industries
         self.content_templates = {
@@ -64,25 +116,31 @@ class LinkedInAgent:
         self.target_keywords = []
         
     def setup_driver(self):
-        """Setup Chrome WebDriver with appropriate options"""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        """Start a lean Chrome WebDriver"""
+        self.driver = acquire_driver()
+        self.cancel_token.on_cancel(self.close)
         self.wait = WebDriverWait(self.driver, 10)
+
+    def close(self):
+        """Release the browser if it is still running"""
+        driver, self.driver = self.driver, None
+        release_task_driver(driver, self.cancel_token)
+
+    def _cancelled(self, pause=0):
+        """Sleep up to `pause` seconds and report whether the task was cancelled"""
+        if self.cancel_token.sleep(pause):
+            self.logger.warning(f"⏹️ Task cancelled: {self.cancel_token.reason}")
+            return True
+        return False
         
+    @timed("login")
     def login(self):
         """Login to LinkedIn"""
         try:
+            if restore_session(self.driver, self.email, self.password, base_url=self.base_url):
+                return True
             self.logger.info("Logging in to LinkedIn...")
-            self.driver.get("https://www.linkedin.com/login")
+            self.driver.get(linkedin_urls.linkedin_url("/login", self.base_url))
             
             # Enter email
             email_field = self.wait.until(EC.presence_of_element_located((By.ID, "username")))
@@ -99,6 +157,7 @@ class LinkedInAgent:
             # Wait for home page
             self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "feed-shared-update-v2")))
             self.logger.info("Successfully logged in to LinkedIn")
+            save_session(self.driver, self.email, self.password)
             return True
             
         except Exception as e:
@@ -107,100 +166,109 @@ class LinkedInAgent:
     
     def clean_content(self, content):
         """Clean content to remove characters that cause ChromeDriver issues"""
-        import re
-        import unicodedata
-        
-        # Remove or replace problematic characters
-        content = content.replace('"', '"').replace('"', '"')  # Replace smart quotes
-        content = content.replace(''', "'").replace(''', "'")  # Replace smart apostrophes
-        content = content.replace('—', '-').replace('–', '-')  # Replace em/en dashes
-        content = content.replace('…', '...')  # Replace ellipsis
-        
-        # Remove any non-BMP characters (outside Basic Multilingual Plane)
-        content = ''.join(char for char in content if ord(char) <= 0xFFFF)
-        
-        # Normalize unicode characters
-        content = unicodedata.normalize('NFKD', content)
-        
-        # Remove any remaining problematic characters
-        content = re.sub(r'[^\x00-\x7F\x80-\xFF\u0100-\uFFFF]', '', content)
-        
-        return content.strip()
+        return normalize(content)
     
+    @timed("content_generation")
     def generate_unique_content(self, industry="tech"):
         """Generate unique, diverse content using AI"""
+        if not self.openai_api_key:
+            self.logger.warning("No OpenAI API key provided, using template content")
+            return self.generate_template_content(industry)
         try:
-            if not self.openai_api_key:
-                self.logger.warning("No OpenAI API key provided, using template content")
-                return self.generate_template_content(industry)
-            
-            # Dynamic content topics and formats
-            content_types = [
-                "industry_insight", "personal_experience", "trend_analysis", 
-                "question_post", "story_telling", "tip_sharing", "prediction"
-            ]
-            
-            topics_pool = [
-                "artificial intelligence", "machine learning", "generative AI", "automation",
-                "digital transformation", "cloud computing", "cybersecurity", "blockchain",
-                "startup ecosystem", "venture capital", "product management", "leadership",
-                "remote work", "team building", "innovation", "data science",
-                "software engineering", "DevOps", "user experience", "business strategy"
-            ]
-            
-            post_styles = [
-                "thought-provoking question", "personal story with lesson", "industry prediction",
-                "contrarian viewpoint", "tips and advice", "behind-the-scenes insight",
-                "collaboration call", "celebration post", "learning experience"
-            ]
-            
-            # Randomly select content parameters
-            content_type = random.choice(content_types)
-            topic = random.choice(topics_pool)
-            style = random.choice(post_styles)
-            
-            # Generate timestamp-based unique element
-            current_time = datetime.now()
-            time_context = self.get_time_context(current_time)
-            
-            openai.api_key = self.openai_api_key
-            
+            return self.generate_ai_content(industry)
+        except Exception as e:
+            self.logger.error(f"AI content generation failed: {str(e)}")
+            return self.generate_template_content(industry)
+
+    def generate_ai_content(self, industry="tech"):
+        """AI-written, cleaned post; raises instead of falling back to a template"""
+        messages, temperature = self.post_prompt(industry)
+        content = get_client("openai", self.openai_api_key).complete(messages, max_tokens=250, temperature=temperature)
+        return self.clean_content(content)
+
+    def stream_content(self, industry="tech", topic=None):
+        """
+        The AI-written post, yielded in pieces as the model produces them, from
+        the same prompt as generate_unique_content (or generate_topic_content
+        when a topic is given). Raises LLMError; clean the joined text before use.
+        """
+        messages, temperature = self.post_prompt(industry, topic)
+        return get_client("openai", self.openai_api_key).stream(messages, max_tokens=250, temperature=temperature)
+
+    def post_prompt(self, industry="tech", topic=None):
+        """Chat messages and temperature for a post on topic, or a randomized one"""
+        if topic:
             prompt = f"""
-            Create a unique, engaging LinkedIn post with these parameters:
-            - Content type: {content_type}
-            - Topic: {topic}
-            - Style: {style}
-            - Time context: {time_context}
-            - Industry focus: {industry}
-            
-            Requirements:
-            - Make it authentic and personal
-            - Include 3-5 relevant hashtags
-            - Ask an engaging question or call-to-action
+            Create a unique, engaging LinkedIn post about {topic} in the {industry} industry.
+            The post should be:
+            - Authentic and personal (not corporate-speak)
+            - Include a compelling hook or insight
+            - Ask an engaging question
+            - Include 3-4 relevant hashtags
             - Be 120-180 words
-            - Use only standard characters (no special Unicode)
-            - Make it unique and different from typical corporate posts
-            - Add some personality and authenticity
+            - Use only standard characters
+            - Avoid phrases like "I'm excited to share" or generic "thoughts?"
             
-            Avoid generic phrases like "I'm excited to share" or "thoughts?"
+            Make it conversational and thought-provoking.
             """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional content creator who writes authentic, engaging LinkedIn posts that spark genuine conversations."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=250,
-                temperature=0.8  # Higher creativity
-            )
-            
-            content = response.choices[0].message.content.strip()
-            return self.clean_content(content)
-                
-        except Exception as e:
-            self.logger.error(f"AI content generation failed: {str(e)}")
-            return self.generate_template_content(industry)
+            return [
+                {"role": "system", "content": "You write authentic, engaging LinkedIn posts that spark real conversations."},
+                {"role": "user", "content": prompt}
+            ], 0.7
+
+        # Dynamic content topics and formats
+        content_types = [
+            "industry_insight", "personal_experience", "trend_analysis", 
+            "question_post", "story_telling", "tip_sharing", "prediction"
+        ]
+        
+        topics_pool = [
+            "artificial intelligence", "machine learning", "generative AI", "automation",
+            "digital transformation", "cloud computing", "cybersecurity", "blockchain",
+            "startup ecosystem", "venture capital", "product management", "leadership",
+            "remote work", "team building", "innovation", "data science",
+            "software engineering", "DevOps", "user experience", "business strategy"
+        ]
+        
+        post_styles = [
+            "thought-provoking question", "personal story with lesson", "industry prediction",
+            "contrarian viewpoint", "tips and advice", "behind-the-scenes insight",
+            "collaboration call", "celebration post", "learning experience"
+        ]
+        
+        # Randomly select content parameters
+        content_type = random.choice(content_types)
+        topic = random.choice(topics_pool)
+        style = random.choice(post_styles)
+        
+        # Generate timestamp-based unique element
+        current_time = datetime.now()
+        time_context = self.get_time_context(current_time)
+        
+        prompt = f"""
+        Create a unique, engaging LinkedIn post with these parameters:
+        - Content type: {content_type}
+        - Topic: {topic}
+        - Style: {style}
+        - Time context: {time_context}
+        - Industry focus: {industry}
+        
+        Requirements:
+        - Make it authentic and personal
+        - Include 3-5 relevant hashtags
+        - Ask an engaging question or call-to-action
+        - Be 120-180 words
+        - Use only standard characters (no special Unicode)
+        - Make it unique and different from typical corporate posts
+        - Add some personality and authenticity
+        
+        Avoid generic phrases like "I'm excited to share" or "thoughts?"
+        """
+        
+        return [
+            {"role": "system", "content": "You are a professional content creator who writes authentic, engaging LinkedIn posts that spark genuine conversations."},
+            {"role": "user", "content": prompt}
+        ], 0.8  # Higher creativity
     
     def get_time_context(self, current_time):
         """Get time-based context for content"""
@@ -238,6 +306,55 @@ class LinkedInAgent:
         
         return self.clean_content(content)
     
+    def ensure_unique(self, content, regenerate, attempts=3):
+        """
+        Return content, or a regenerated draft, that is not a near-duplicate
+        of anything posted before; None when every attempt was too similar.
+        """
+        index = default_index()
+        for attempt in range(attempts + 1):
+            matches = index.similar(self.clean_content(content))
+            if not matches:
+                return content
+            similarity, earlier = matches[0]
+            self.logger.warning(f"Draft is {similarity:.0%} similar to an earlier post ({earlier['preview'][:50]}...)")
+            if attempt < attempts:
+                content = regenerate()
+        return None
+
+    @contextmanager
+    def _step(self, phase):
+        """Time one step of a browser flow into PHASE_SECONDS and the log"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            PHASE_SECONDS.observe(elapsed, phase=phase)
+            self.logger.info(f"⏱️ {phase} took {elapsed:.2f}s")
+
+    def _until(self, condition, timeout=10):
+        """
+        Poll condition(driver) until it returns something truthy and return it.
+        Returns None on timeout or as soon as the task is cancelled.
+        """
+        def check(driver):
+            return True if self.cancel_token.cancelled else condition(driver)
+
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=0.2, ignored_exceptions=(StaleElementReferenceException,)
+            ).until(check)
+        except TimeoutException:
+            return None
+        return None if self.cancel_token.cancelled else result
+
+    def _find(self, name, selectors, state="visible", timeout=10):
+        """Wait for the first of several fallback selectors to match; None on timeout or cancellation"""
+        return SELECTORS.wait(self.driver, name, selectors, timeout=timeout, state=state,
+                              should_stop=lambda: self.cancel_token.cancelled)
+
+    @timed("create_post")
     def create_post(self, content):
         """Create a LinkedIn post"""
         try:
@@ -247,89 +364,55 @@ class LinkedInAgent:
             clean_content = self.clean_content(content)
             self.logger.info(f"Cleaned content: {clean_content[:100]}...")
             
-            # Go to LinkedIn home
-            self.driver.get("https://www.linkedin.com/feed/")
-            time.sleep(3)
-            
-            # Try different selectors for the "Start a post" button
-            start_post_selectors = [
-                "//button[contains(@class, 'artdeco-button') and contains(., 'Start a post')]",
-                "//span[text()='Start a post']/parent::button",
-                "//button[contains(text(), 'Start a post')]",
-                "//*[contains(@class, 'share-box-feed-entry__trigger')]",
-                "//div[contains(@class, 'share-box-feed-entry__closed-share-box')]"
-            ]
-            
-            start_post_clicked = False
-            for selector in start_post_selectors:
-                try:
-                    start_post = self.wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
-                    start_post.click()
-                    start_post_clicked = True
-                    break
-                except:
-                    continue
-            
-            if not start_post_clicked:
+            # Go to LinkedIn home and wait for any "Start a post" trigger to become clickable
+            with self._step("post_open_feed"):
+                self.driver.get(linkedin_urls.linkedin_url("/feed/", self.base_url))
+                start_post = self._find("start_post", START_POST_SELECTORS, state="clickable")
+            if self._cancelled():
+                return False
+            if start_post is None:
                 self.logger.error("Could not find 'Start a post' button")
                 return False
             
-            time.sleep(3)
-            
-            # Try different selectors for the post text area
-            text_area_selectors = [
-                "//div[@data-placeholder='What do you want to talk about?']",
-                "//div[contains(@class, 'ql-editor')]",
-                "//div[@role='textbox']",
-                "//div[@contenteditable='true']"
-            ]
-            
-            post_textbox = None
-            for selector in text_area_selectors:
-                try:
-                    post_textbox = self.wait.until(EC.presence_of_element_located((By.XPATH, selector)))
-                    break
-                except:
-                    continue
-            
-            if not post_textbox:
+            # The share modal is open once its editor is visible
+            with self._step("post_open_modal"):
+                start_post.click()
+                post_textbox = self._find("post_editor", TEXT_AREA_SELECTORS)
+            if self._cancelled():
+                return False
+            if post_textbox is None:
                 self.logger.error("Could not find post text area")
                 return False
+            modal = _enclosing_dialog(post_textbox)
             
-            # Click and enter content
-            post_textbox.click()
-            time.sleep(1)
-            
-            # Clear any existing content and type new content
-            post_textbox.clear()
-            post_textbox.send_keys(clean_content)
-            
-            time.sleep(3)
-            
-            # Try different selectors for the Post button
-            post_button_selectors = [
-                "//button[contains(@class, 'share-actions-primary-button') and .//span[text()='Post']]",
-                "//button[.//span[text()='Post']]",
-                "//button[contains(@data-control-name, 'share.post')]",
-                "//button[text()='Post']"
-            ]
-            
-            post_button_clicked = False
-            for selector in post_button_selectors:
-                try:
-                    post_button = self.driver.find_element(By.XPATH, selector)
-                    if post_button.is_enabled():
-                        post_button.click()
-                        post_button_clicked = True
-                        break
-                except:
-                    continue
+            # Focus the editor and enter content
+            with self._step("post_focus_editor"):
+                post_textbox.click()
+                focused = self._until(lambda d: _has_focus(d, post_textbox), timeout=5)
+            if self._cancelled():
+                return False
+            if not focused:
+                self.logger.error("Post text area did not take focus")
+                return False
             
-            if not post_button_clicked:
+            with self._step("post_enter_text"):
+                insert_text(self.driver, post_textbox, clean_content)
+                post_button = self._find("post_button", POST_BUTTON_SELECTORS, state="enabled")
+            if self._cancelled():
+                return False
+            if post_button is None:
                 self.logger.error("Could not find or click Post button")
                 return False
             
-            time.sleep(5)
+            # Submitted once the share modal closes or LinkedIn shows its confirmation toast
+            with self._step("post_submit"):
+                post_button.click()
+                confirmed = self._until(lambda d: _modal_closed(modal) or SELECTORS.match(d, POST_TOAST_SELECTORS), timeout=20)
+            default_index().add(clean_content)
+            if not confirmed:
+                # the click went through, so a missing confirmation is not treated as a failure
+                self.logger.warning("Post submitted but no confirmation was seen")
+                return True
             self.logger.info("Post created successfully!")
             return True
             
@@ -413,7 +496,7 @@ class LinkedInAgent:
         """Search and connect for a specific keyword"""
         try:
             # Go to LinkedIn people search with filters
-            search_url = f"https://www.linkedin.com/search/results/people/?keywords={keyword.replace(' ', '%20')}&origin=SWITCH_SEARCH_VERTICAL"
+            search_url = f"{self.base_url}/search/results/people/?keywords={keyword.replace(' ', '%20')}&origin=SWITCH_SEARCH_VERTICAL"
             self.driver.get(search_url)
             time.sleep(3)
             
@@ -525,7 +608,7 @@ class LinkedInAgent:
             self.logger.info("=" * 60)
             self.setup_driver()
             
-            if not self.login():
+            if not self.login() or self._cancelled():
                 return False
             
             # Generate unique, AI-powered content
@@ -534,8 +617,14 @@ class LinkedInAgent:
                 # If specific topic provided, use it
                 content = self.generate_topic_content(industry, topic)
             else:
-                # Generate unique diverse content
-                content = self.generate_unique_content(industry)
+                # Take a pre-generated draft if one is ready, else generate unique diverse content
+                content = (self.openai_api_key and default_buffer().take(industry, self.openai_api_key)) or self.generate_unique_content(industry)
+            
+            regenerate = (lambda: self.generate_topic_content(industry, topic)) if topic else (lambda: self.generate_unique_content(industry))
+            content = self.ensure_unique(content, regenerate)
+            if content is None:
+                self.logger.error("❌ Every draft was a near-duplicate of an earlier post; not posting")
+                return False
             
             self.logger.info(f"📝 Generated content preview: {content[:150]}...")
             
@@ -576,9 +665,10 @@ class LinkedInAgent:
             return False
         finally:
             if self.driver:
-                self.driver.quit()
+                self.close()
                 self.logger.info("🔒 Browser closed securely")
     
+    @timed("content_generation")
     def generate_topic_content(self, industry, topic):
         """Generate content for a specific topic (backward compatibility)"""
         try:
@@ -587,33 +677,8 @@ class LinkedInAgent:
                 template = f"Exploring the fascinating world of {topic} in {industry}. The potential applications are incredible! What's your experience with {topic}? How do you see it shaping the future of {industry}? #Tech #Innovation #{topic.replace(' ', '')}"
                 return self.clean_content(template)
             
-            openai.api_key = self.openai_api_key
-            
-            prompt = f"""
-            Create a unique, engaging LinkedIn post about {topic} in the {industry} industry.
-            The post should be:
-            - Authentic and personal (not corporate-speak)
-            - Include a compelling hook or insight
-            - Ask an engaging question
-            - Include 3-4 relevant hashtags
-            - Be 120-180 words
-            - Use only standard characters
-            - Avoid phrases like "I'm excited to share" or generic "thoughts?"
-            
-            Make it conversational and thought-provoking.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You write authentic, engaging LinkedIn posts that spark real conversations."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=250,
-                temperature=0.7
-            )
-            
-            content = response.choices[0].message.content.strip()
+            messages, temperature = self.post_prompt(industry, topic)
+            content = get_client("openai", self.openai_api_key).complete(messages, max_tokens=250, temperature=temperature)
             return self.clean_content(content)
                 
         except Exception as e:
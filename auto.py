@@ -1,42 +1,45 @@
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from cancellation import CancelToken
+from driver_factory import acquire_driver, release_task_driver
+from session_store import restore_session, save_session
+import linkedin_urls
+from llm_client import get_client
+from metrics import PHASE_SECONDS
+from selector_engine import ENGINE as SELECTORS
+from text_input import insert_text
 
-def start_messaging_bot(username: str, password: str, gemini_api_key: str | None = None):
-    model = None
-    if gemini_api_key:
-        import google.generativeai as genai
-        genai.configure(api_key=gemini_api_key)
-        model = genai.GenerativeModel("gemini-1.5-flash")
+def start_messaging_bot(username: str, password: str, gemini_api_key: str | None = None, cancel_token: CancelToken | None = None, base_url: str | None = None):
+    cancel_token = cancel_token or CancelToken()
+    base_url = base_url or linkedin_urls.base_url()
+    llm = get_client("gemini", gemini_api_key) if gemini_api_key else None
 
     def generate_reply(message_text: str) -> str:
-        if not model:
+        if not llm:
             return "Thanks for your message! I'll get back to you soon."
         try:
             prompt = (
                 f"You are replying on LinkedIn.\nMessage: \"{message_text}\"\n"
                 "Rules:\n- Reply in under 40 words\n- Be professional, natural, friendly\n- No emojis, no switching platforms\n- If greeting, greet back and ask how to help"
             )
-            response = model.generate_content(prompt)
-            reply = (response.text or "").strip()
+            # short deadline: the reply is generated inside the polling loop
+            reply = llm.complete([{"role": "user", "content": prompt}], max_tokens=100, timeout=10)
             return reply or "Thanks for your message! I'll get back to you soon."
         except Exception:
             return "Thanks for your message! I'll get back to you soon."
 
-    chrome_options = Options()
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    driver = acquire_driver()
+    held = [driver]
 
-    driver = webdriver.Chrome(options=chrome_options)
+    def release():
+        # once only, as LinkedInAgent.close: JobExecutor forces the token after every job, and
+        # quitting here would kill a browser the finally block already returned to the pool
+        current, held[0] = held[0], None
+        release_task_driver(current, cancel_token)
+
+    cancel_token.on_cancel(release)
     wait = WebDriverWait(driver, 15)
 
     def find_messages():
@@ -45,23 +48,17 @@ def start_messaging_bot(username: str, password: str, gemini_api_key: str | None
             "div.msg-s-message-list__event",
             "li.msg-s-message-list__event",
         ]
-        for selector in selectors:
-            try:
-                messages = driver.find_elements(By.CSS_SELECTOR, selector)
-                if messages:
-                    return messages
-            except:
-                continue
-        return []
+        try:
+            return SELECTORS.find(driver, "message_items", selectors, by="css", state="present", many=True)
+        except Exception:
+            return []
 
     def send_message_safe(message_text: str) -> bool:
         try:
             msg_box = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.msg-form__contenteditable")))
             msg_box.click()
             time.sleep(1)
-            msg_box.send_keys(Keys.CONTROL + "a")
-            msg_box.send_keys(Keys.DELETE)
-            msg_box.send_keys(message_text)
+            insert_text(driver, msg_box, message_text)
             time.sleep(1)
             send_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.msg-form__send-button")))
             driver.execute_script("arguments[0].click();", send_button)
@@ -70,20 +67,27 @@ def start_messaging_bot(username: str, password: str, gemini_api_key: str | None
             return False
 
     try:
-        driver.get("https://www.linkedin.com/login")
-        wait.until(EC.presence_of_element_located((By.ID, "username"))).send_keys(username)
-        driver.find_element(By.ID, "password").send_keys(password)
-        driver.find_element(By.XPATH, "//button[@type='submit']").click()
-        time.sleep(5)
-        if "feed" not in driver.current_url and "messaging" not in driver.current_url:
-            return False
+        login_start = time.perf_counter()
+        if not restore_session(driver, username, password, base_url=base_url):
+            driver.get(linkedin_urls.linkedin_url("/login", base_url))
+            wait.until(EC.presence_of_element_located((By.ID, "username"))).send_keys(username)
+            driver.find_element(By.ID, "password").send_keys(password)
+            driver.find_element(By.XPATH, "//button[@type='submit']").click()
+            time.sleep(5)
+            if "feed" not in driver.current_url and "messaging" not in driver.current_url:
+                return False
+            save_session(driver, username, password)
+        PHASE_SECONDS.observe(time.perf_counter() - login_start, phase="login")
         processed_messages = set()
-        while True:
+        while not cancel_token.cancelled:
+            cycle_start = time.perf_counter()
             try:
-                driver.get("https://www.linkedin.com/messaging/")
+                driver.get(linkedin_urls.linkedin_url("/messaging/", base_url))
                 wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.msg-conversation-listitem")))
                 chats = driver.find_elements(By.CSS_SELECTOR, "li.msg-conversation-listitem")
                 for chat in chats[:5]:
+                    if cancel_token.cancelled:
+                        break
                     chat.click()
                     time.sleep(3)
                     messages = find_messages()
@@ -99,15 +103,16 @@ def start_messaging_bot(username: str, password: str, gemini_api_key: str | None
                     if send_message_safe(reply):
                         processed_messages.add(last_message_id)
                     time.sleep(2)
-                time.sleep(15)
+                PHASE_SECONDS.observe(time.perf_counter() - cycle_start, phase="messaging_poll")
+                cancel_token.sleep(15)
             except KeyboardInterrupt:
                 break
             except Exception:
-                time.sleep(10)
+                cancel_token.sleep(10)
     except Exception:
         return False
     finally:
-        driver.quit()
+        release()
     return True
 
 if __name__ == "__main__":
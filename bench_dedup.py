@@ -0,0 +1,65 @@
+"""
+Near-duplicate index benchmark: lookup latency against a large history.
+
+Fills a NearDuplicateIndex with synthetic ~140-word posts, then times
+signature + lookup for fresh and near-duplicate drafts.
+
+    python bench_dedup.py --history 20000
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from dedup_index import NearDuplicateIndex
+
+
+def _post(rng, vocabulary, words=140):
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history", type=int, default=20000, help="number of historical posts")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--max-ms", type=float, help="fail if the median lookup takes longer than this")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(20000)]
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    history = [_post(rng, vocabulary) for _ in range(args.history)]
+    for text in history:
+        index.add(text)
+    print(f"indexed {len(index)} posts in {time.perf_counter() - start:.2f}s")
+
+    words = history[-1].split()
+    for i in range(0, len(words), 20):
+        words[i] = "edited"
+    near = " ".join(words)
+    fresh = _post(rng, vocabulary)
+
+    near_median, near_max = _timed(lambda: index.similar(near), args.repeat)
+    fresh_median, fresh_max = _timed(lambda: index.similar(fresh), args.repeat)
+    print(f"near-duplicate draft: median {near_median:.3f} ms, max {near_max:.3f} ms, matches={len(index.similar(near))}")
+    print(f"fresh draft:          median {fresh_median:.3f} ms, max {fresh_max:.3f} ms, matches={len(index.similar(fresh))}")
+
+    if args.max_ms is not None and max(near_median, fresh_median) > args.max_ms:
+        print(f"FAIL: median lookup above {args.max_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
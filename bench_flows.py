@@ -0,0 +1,127 @@
+"""
+End-to-end benchmark of the browser flows against the local fixture server.
+
+Runs the post flow (driver start, login, create_post) and one messaging
+cycle against fixture_server.py, then reports per-phase latency from
+linkedin_phase_duration_seconds. Nothing leaves the machine; it needs
+Chrome and chromedriver on PATH, as in the Docker image.
+
+    python bench_flows.py --runs 3 --latency 0.05
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+
+from fixture_server import FixtureServer
+
+POST_TEXT = (
+    "Benchmark post from the offline fixture server. Measuring how long each step of the "
+    "share flow takes so regressions show up before they reach the real site. #Benchmark"
+)
+
+
+def bench_post(runs, base_url):
+    from app import LinkedInAgent
+
+    results = []
+    for _ in range(runs):
+        agent = LinkedInAgent(email="bench@example.com", password="fixture", base_url=base_url)
+        start = time.perf_counter()
+        try:
+            agent.setup_driver()
+            ok = agent.login() and agent.create_post(POST_TEXT)
+        finally:
+            agent.close()
+        results.append({"ok": bool(ok), "seconds": time.perf_counter() - start})
+    return results
+
+
+def bench_messaging(server, base_url, timeout):
+    from auto import start_messaging_bot
+    from cancellation import CancelToken
+
+    token = CancelToken()
+    before = len(server.messages)
+    start = time.perf_counter()
+    thread = threading.Thread(
+        target=start_messaging_bot, args=("bench@example.com", "fixture"),
+        kwargs={"cancel_token": token, "base_url": base_url}, daemon=True,
+    )
+    thread.start()
+    # one poll cycle replies to every fixture conversation
+    deadline = start + timeout
+    while time.perf_counter() < deadline and len(server.messages) - before < 3 and thread.is_alive():
+        time.sleep(0.2)
+    replies = len(server.messages) - before
+    elapsed = time.perf_counter() - start
+    token.cancel("benchmark finished")
+    thread.join(30)
+    return {"replies": replies, "seconds": elapsed}
+
+
+def phase_summary():
+    from metrics import PHASE_SECONDS
+
+    return {
+        labels[0]: {"count": count, "total_seconds": round(total, 3), "mean_seconds": round(total / count, 3)}
+        for labels, (count, total) in sorted(PHASE_SECONDS.summary().items())
+        if count
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="post flow repetitions")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated server latency per response, seconds")
+    parser.add_argument("--skip-messaging", action="store_true")
+    parser.add_argument("--messaging-timeout", type=float, default=60)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="linkedin-bench-")
+    with FixtureServer(latency=args.latency) as server:
+        # keep the benchmark away from real caches, sessions and standby browsers
+        os.environ.update({
+            "LINKEDIN_BASE_URL": server.url,
+            "SELECTOR_CACHE": os.path.join(scratch, "selector_cache.json"),
+            # create_post records every post in the near-duplicate history
+            "DEDUP_INDEX_PATH": os.path.join(scratch, "posted_index.jsonl"),
+            "DRAFT_CACHE_PATH": os.path.join(scratch, "draft_cache.json"),
+            "DRAFT_BUFFER_PATH": os.path.join(scratch, "drafts.json"),
+        })
+        os.environ.pop("SESSION_STORE_DIR", None)
+
+        posts = bench_post(args.runs, server.url)
+        messaging = None if args.skip_messaging else bench_messaging(server, server.url, args.messaging_timeout)
+        result = {
+            "post": {
+                "runs": len(posts),
+                "succeeded": sum(r["ok"] for r in posts),
+                "posts_received": len(server.posts),
+                "median_seconds": round(statistics.median(r["seconds"] for r in posts), 3),
+                "max_seconds": round(max(r["seconds"] for r in posts), 3),
+            },
+            "messaging": messaging,
+            "phases": phase_summary(),
+        }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        post = result["post"]
+        print(f"post flow: {post['succeeded']}/{post['runs']} ok, median {post['median_seconds']}s, max {post['max_seconds']}s")
+        if messaging:
+            print(f"messaging cycle: {messaging['replies']} replies in {messaging['seconds']:.2f}s")
+        print(f"{'phase':<24}{'count':>7}{'mean s':>10}{'total s':>10}")
+        for phase, stats in result["phases"].items():
+            print(f"{phase:<24}{stats['count']:>7}{stats['mean_seconds']:>10.3f}{stats['total_seconds']:>10.3f}")
+    return 0 if result["post"]["succeeded"] == result["post"]["runs"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Post text normalizer benchmark: per-draft cost and a randomized equivalence check.
+
+Times text_normalizer.normalize() against the previous per-call
+implementation of clean_content on ASCII and typographic drafts, then
+checks on random strings that both agree, that the output is a fixed
+point (normalizing twice changes nothing) and that no smart punctuation
+or astral characters survive.
+
+    python bench_normalize.py --samples 5000
+"""
+import re
+import sys
+import time
+import random
+import argparse
+import unicodedata
+
+from text_normalizer import normalize, normalize_many
+
+_ALPHABET = (
+    [chr(c) for c in range(0x20, 0x7F)] * 4
+    + list("\t\n  ")
+    + list("éüñçßøÅæ")                     # Latin-1 letters
+    + list("“”‘’—–…")                       # smart punctuation
+    + ["é", "̀", "ﬁ", "①", "㎏"]  # combining marks and compatibility forms
+    + list("中文日本語한국어")
+    + ["🚀", "💡", "👉", "🇺🇸", "😀"]        # astral plane
+)
+
+_TYPOGRAPHIC = ("🚀 “Shipping beats perfect” — here’s what we learned… "
+                "Café-grade focus, naïve assumptions and 3–5 retros later. 💡 #Engineering")
+_ASCII = ("Shipping beats perfect - here's what we learned... "
+          "Small teams, short feedback loops and 3-5 retros later. #Engineering")
+
+
+def reference(content):
+    """The previous clean_content, with the smart quote mapping it was meant to have"""
+    content = content.replace("“", '"').replace("”", '"')
+    content = content.replace("‘", "'").replace("’", "'")
+    content = content.replace("—", "-").replace("–", "-")
+    content = content.replace("…", "...")
+    content = "".join(char for char in content if ord(char) <= 0xFFFF)
+    content = unicodedata.normalize("NFKD", content)
+    content = re.sub(r"[^\x00-\x7F\x80-\xFFĀ-￿]", "", content)
+    return content.strip()
+
+
+def _per_call_us(fn, texts, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+def check(samples, seed=0):
+    """Failure descriptions for random inputs (empty when everything holds)"""
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(samples):
+        text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 80)))
+        out = normalize(text)
+        if out != reference(text):
+            failures.append(f"differs from reference: {text!r}")
+        elif normalize(out) != out:
+            failures.append(f"not idempotent: {text!r}")
+        elif any(ord(c) > 0xFFFF or c in "“”‘’—–…" for c in out):
+            failures.append(f"unsafe characters left: {text!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5000, help="random strings to check")
+    parser.add_argument("--drafts", type=int, default=2000, help="drafts per timing run")
+    parser.add_argument("--max-us", type=float, help="fail if a typographic draft takes longer than this")
+    args = parser.parse_args()
+
+    for label, text in (("ascii", _ASCII), ("typographic", _TYPOGRAPHIC)):
+        texts = [text] * args.drafts
+        before = _per_call_us(reference, texts)
+        after = _per_call_us(normalize, texts)
+        print(f"{label:12} previous {before:7.2f} us  normalize {after:7.2f} us  ({before / after:.1f}x)")
+
+    batch = [_TYPOGRAPHIC, _ASCII] * (args.drafts // 2)
+    start = time.perf_counter()
+    normalize_many(batch)
+    print(f"normalize_many: {len(batch)} drafts in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    failures = check(args.samples)
+    print(f"checked {args.samples} random strings: {len(failures)} failures")
+    for failure in failures[:10]:
+        print(f"  {failure}", file=sys.stderr)
+
+    typographic = _per_call_us(normalize, [_TYPOGRAPHIC] * args.drafts)
+    if failures or (args.max_us is not None and typographic > args.max_us):
+        print("FAIL", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
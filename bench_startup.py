@@ -0,0 +1,77 @@
+"""
+Startup benchmark: time and memory for a fresh `import dashboard`.
+
+Each run imports the dashboard in a new interpreter (standby browsers
+disabled) and reports wall time, peak RSS and which heavy job
+dependencies got loaded. Exits non-zero when a budget is exceeded, so it
+can guard against an eager import creeping back in.
+
+    python bench_startup.py --runs 5 --max-seconds 1.5 --max-rss-mb 120
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = ("selenium", "openai", "schedule", "webdriver_manager", "google.generativeai")
+
+_PROBE = """
+import json, sys, time, resource
+start = time.perf_counter()
+import dashboard
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once(cwd):
+    env = dict(os.environ, BROWSER_POOL_SIZE="0")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, help="fail if the median import time is above this")
+    parser.add_argument("--max-rss-mb", type=float, help="fail if the median peak RSS is above this")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    runs = [measure_once(cwd) for _ in range(args.runs)]
+    result = {
+        "runs": args.runs,
+        "median_seconds": round(statistics.median(r["seconds"] for r in runs), 3),
+        "max_seconds": round(max(r["seconds"] for r in runs), 3),
+        "median_rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+        "heavy_modules": sorted({m for r in runs for m in r["heavy"]}),
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"import dashboard: median {result['median_seconds']}s, max {result['max_seconds']}s over {args.runs} runs")
+        print(f"peak RSS: median {result['median_rss_mb']} MB")
+        print(f"heavy modules loaded: {', '.join(result['heavy_modules']) or 'none'}")
+
+    failed = False
+    if args.max_seconds is not None and result["median_seconds"] > args.max_seconds:
+        print(f"FAIL: import time above {args.max_seconds}s", file=sys.stderr)
+        failed = True
+    if args.max_rss_mb is not None and result["median_rss_mb"] > args.max_rss_mb:
+        print(f"FAIL: RSS above {args.max_rss_mb} MB", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
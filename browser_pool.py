@@ -0,0 +1,169 @@
+import time
+import logging
+import threading
+from collections import deque
+
+from metrics import PHASE_SECONDS, REGISTRY, Counter
+from resource_monitor import process_tree, register_driver
+from linkedin_urls import base_url
+
+logger = logging.getLogger("linkedin_agent")
+
+BROWSER_ACQUIRES = REGISTRY.register(Counter(
+    "linkedin_browser_acquires_total",
+    "Browsers handed to tasks, by whether a warm standby was available",
+    ("source",),
+))
+BROWSER_RECYCLES = REGISTRY.register(Counter(
+    "linkedin_browser_recycles_total",
+    "Browsers quit instead of returned to the pool, by reason",
+    ("reason",),
+))
+
+
+def driver_rss(driver):
+    """Resident memory of a driver's chromedriver and browser processes, in bytes"""
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        return 0
+    return sum(s.rss for s in process_tree(pid))
+
+
+class BrowserPool:
+    """
+    Keep `size` idle, pre-launched browsers so a task starts without paying
+    Chrome's cold start.
+
+    acquire() hands out a warm browser (or starts one if none is idle) and
+    launches a replacement in the background. release() wipes cookies and
+    storage and returns the browser to the pool if the pool is short,
+    unless it has served max_uses tasks, is using more than max_rss_mb, or
+    the task asked for it to be discarded; otherwise it is quit.
+    """
+
+    def __init__(self, factory, size=1, max_uses=20, max_rss_mb=None, retry_delay=60):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._uses = {}
+        self._launching = 0
+        self._retry_at = 0
+        self._closed = False
+
+    @property
+    def idle(self):
+        with self._lock:
+            return len(self._idle)
+
+    def start(self):
+        self._refill()
+        return self
+
+    def acquire(self):
+        start = time.perf_counter()
+        with self._lock:
+            driver, uses = self._idle.popleft() if self._idle else (None, 0)
+        self._refill()
+        if driver is not None and not self._alive(driver):
+            self._quit(driver, "dead")
+            driver = None
+        source = "warm" if driver is not None else "cold"
+        if driver is None:
+            driver, uses = self.factory(), 0
+        with self._lock:
+            self._uses[id(driver)] = uses
+        register_driver(driver)
+        BROWSER_ACQUIRES.inc(source=source)
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase="driver_acquire")
+        return driver
+
+    def release(self, driver, reuse=True):
+        with self._lock:
+            uses = self._uses.pop(id(driver), 0) + 1
+        reason = self._recycle_reason(driver, uses, reuse)
+        if reason is None and self._reset(driver):
+            with self._lock:
+                if not self._closed and len(self._idle) < self.size:
+                    self._idle.append((driver, uses))
+                    return
+            reason = "surplus"
+        self._quit(driver, reason or "reset_failed")
+        self._refill()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for driver, _ in idle:
+            self._quit(driver, None)
+
+    def _recycle_reason(self, driver, uses, reuse):
+        if not reuse:
+            return "discarded"
+        if uses >= self.max_uses:
+            return "max_uses"
+        if self.max_rss_mb and driver_rss(driver) > self.max_rss_mb * 1048576:
+            return "memory"
+        return None
+
+    @staticmethod
+    def _alive(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(driver):
+        try:
+            for handle in driver.window_handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            # storage of the site the tasks use; cookies above are cleared for every origin
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": base_url(), "storageTypes": "all"})
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver, reason):
+        if reason:
+            BROWSER_RECYCLES.inc(reason=reason)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _refill(self):
+        with self._lock:
+            missing = self.size - len(self._idle) - self._launching
+            if self._closed or missing <= 0 or time.monotonic() < self._retry_at:
+                return
+            self._launching += missing
+        for _ in range(missing):
+            threading.Thread(target=self._launch, name="browser-pool", daemon=True).start()
+
+    def _launch(self):
+        try:
+            driver = self.factory()
+        except Exception as e:
+            logger.warning(f"Could not pre-launch a standby browser: {e}")
+            with self._lock:
+                self._launching -= 1
+                self._retry_at = time.monotonic() + self.retry_delay
+            return
+        with self._lock:
+            self._launching -= 1
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append((driver, 0))
+                return
+        self._quit(driver, "surplus")
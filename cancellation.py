@@ -0,0 +1,45 @@
+import threading
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag shared between the dashboard and a running task.
+
+    Long loops call `cancelled` or `sleep()` between steps. Cleanup callbacks
+    registered with on_cancel() (typically driver.quit) run when force() is
+    called, which unblocks a task stuck inside a Selenium call.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def sleep(self, seconds):
+        """Sleep up to `seconds`; returns True (early) if the token was cancelled"""
+        return self._event.wait(seconds)
+
+    def on_cancel(self, callback):
+        """Register a cleanup callback for force()"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def force(self):
+        """Run the registered cleanup callbacks once"""
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
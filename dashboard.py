@@ -1,56 +1,135 @@
-import threading
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, send_file, stream_with_context
 import os
-from app import LinkedInAgent
-from auto import start_messaging_bot
-from linkedin_auto_connect import LinkedInAutoConnector
+import atexit
+import threading
+from task_store import open_registry
+from task_registry import FINISHED_STATUSES
+from event_stream import EventBroker, BrokerFull, BrokerLogHandler, sse_frame
+from log_tail import tail, read_since
+from job_executor import JobExecutor, QueueFull
+from process_runner import ProcessRunner, run_inline
+from resource_monitor import ResourceMonitor
+from metrics import REGISTRY as METRICS, Gauge
+from logging_setup import configure_logging
+from task_logs import TaskLogBuffers, TaskLogHandler
+from browser_pool import BrowserPool
+import driver_factory
+from draft_buffer import default_buffer, default_cache
+from jobs import run_post, run_connect, run_messaging
 
 app = Flask(__name__)
 app.secret_key = "dev-secret"
 import logging
+configure_logging()
 logging.getLogger("werkzeug").setLevel(logging.WARNING)
 
-TASKS = {"post": [], "connect": [], "messaging": []}
-_task_counter = 0
+# every /events or /drafts/preview stream holds one of the worker's gunicorn threads (8 in the Dockerfile)
+# while it is open, so both are capped below that to leave threads for ordinary requests; over the cap
+# they answer 503 and the page falls back to polling
+EVENTS = EventBroker(
+    buffer_size=int(os.environ.get("EVENTS_BUFFER_SIZE", "256")),
+    max_subscribers=int(os.environ.get("EVENTS_MAX_STREAMS", "4")),
+)
+PREVIEW_STREAMS = threading.BoundedSemaphore(int(os.environ.get("PREVIEW_MAX_STREAMS", "2")))
+logging.getLogger("linkedin_agent").addHandler(BrokerLogHandler(EVENTS, "agent"))
+logging.getLogger("linkedin_connect").addHandler(BrokerLogHandler(EVENTS, "connect"))
+
+TASK_LOGS = TaskLogBuffers(max_lines=int(os.environ.get("TASK_LOG_LINES", "500")))
+for _name in ("", "linkedin_connect"):
+    logging.getLogger(_name).addHandler(TaskLogHandler(TASK_LOGS))
+
+# TASK_DB=/path/to/tasks.db shares tasks across gunicorn workers and restarts
+TASKS = open_registry(
+    ("post", "connect", "messaging"),
+    path=os.environ.get("TASK_DB"),
+    max_finished=int(os.environ.get("TASK_MAX_FINISHED", "200")),
+    max_age=float(os.environ["TASK_MAX_AGE"]) if os.environ.get("TASK_MAX_AGE") else None,
+    on_change=EVENTS.publish,
+)
+
+def _env_number(name):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+# JOB_ISOLATION=process runs each browser job in a child process with its own limits
+if os.environ.get("JOB_ISOLATION") == "process":
+    JOB_RUNNER = ProcessRunner(
+        max_rss_mb=_env_number("JOB_MAX_RSS_MB"),
+        cpu_seconds=_env_number("JOB_CPU_SECONDS"),
+        address_space_mb=_env_number("JOB_ADDRESS_SPACE_MB"),
+    )
+else:
+    JOB_RUNNER = run_inline
+
+EXECUTOR = JobExecutor(
+    TASKS,
+    runner=JOB_RUNNER,
+    monitor=ResourceMonitor(TASKS, interval=float(os.environ.get("RESOURCE_SAMPLE_INTERVAL", "5"))),
+    max_workers=int(os.environ.get("MAX_BROWSER_SESSIONS", "2")),
+    max_queue=int(os.environ.get("MAX_QUEUED_JOBS", "10")),
+    grace=float(os.environ.get("TASK_CANCEL_GRACE", "10")),
+    # with a shared TASK_DB, a cancel may land on a worker that does not run the job
+    cancel_poll=float(os.environ.get("TASK_CANCEL_POLL", "1")) if os.environ.get("TASK_DB") else None,
+)
+
+# BROWSER_POOL_SIZE idle, pre-launched browsers (0 disables); in-process jobs only
+BROWSER_POOL = None
+if JOB_RUNNER is run_inline and int(os.environ.get("BROWSER_POOL_SIZE", "1")) > 0:
+    BROWSER_POOL = BrowserPool(
+        driver_factory.create_driver,
+        size=int(os.environ.get("BROWSER_POOL_SIZE", "1")),
+        max_uses=int(os.environ.get("BROWSER_MAX_USES", "20")),
+        max_rss_mb=_env_number("BROWSER_MAX_RSS_MB"),
+    ).start()
+    driver_factory.use_pool(BROWSER_POOL)
+    atexit.register(BROWSER_POOL.close)
+
+# pre-generated post drafts, so a post task does not wait on the LLM (DRAFT_BUFFER_SIZE=0 disables)
+DRAFTS = default_buffer().start()
+# drafts a reviewer previewed, so /post can use them by id (DRAFT_CACHE_TTL seconds)
+DRAFT_CACHE = default_cache()
+
+def _task_counts():
+    counts = {}
+    for kind, tasks in TASKS.snapshot()[1].items():
+        for task in tasks:
+            key = (kind, task["status"])
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+METRICS.register(Gauge("linkedin_tasks", "Tasks currently held by the registry", ("kind", "status"), callback=_task_counts))
+METRICS.register(Gauge("linkedin_job_queue_depth", "Jobs waiting for a browser slot", callback=lambda: EXECUTOR.depth))
+METRICS.register(Gauge("linkedin_jobs_active", "Jobs currently running", callback=lambda: EXECUTOR.active))
+METRICS.register(Gauge("linkedin_browser_pool_idle", "Warm standby browsers", callback=lambda: BROWSER_POOL.idle if BROWSER_POOL else 0))
+
+# maximum runtime per task kind, in seconds
+TASK_TIMEOUTS = {
+    "post": float(os.environ.get("POST_TIMEOUT", "600")),
+    "connect": float(os.environ.get("CONNECT_TIMEOUT", "3600")),
+    "messaging": float(os.environ.get("MESSAGING_TIMEOUT", "14400")),
+}
 
 def _create_task(kind, payload):
-    global _task_counter
-    _task_counter += 1
-    task = {"id": _task_counter, "kind": kind, "status": "running", "payload": payload, "message": ""}
-    TASKS[kind].append(task)
+    return TASKS.create(kind, payload, status="queued")
+
+def _submit_task(kind, payload, target, *args):
+    """Create a task and queue target(*args); returns None when the queue is full"""
+    task = _create_task(kind, payload)
+    try:
+        EXECUTOR.submit(task["id"], target, *args, timeout=TASK_TIMEOUTS.get(kind))
+    except QueueFull:
+        TASKS.discard(task["id"])
+        return None
     return task
 
-def run_post(email, password, openai_key, industry, topic, task_id=None):
-    agent = LinkedInAgent(email=email, password=password, openai_api_key=openai_key)
-    agent.setup_driver()
-    if not agent.login():
-        _mark_task(task_id, "error", "login failed")
-        return
-    content = agent.generate_topic_content(industry, topic) if topic else agent.generate_unique_content(industry)
-    agent.create_post(content)
-    if agent.driver:
-        agent.driver.quit()
-    _mark_task(task_id, "completed", "post created")
-
-def run_connect(email, password, keyword, max_connections, task_id=None):
-    bot = LinkedInAutoConnector()
-    if not bot.setup_driver():
-        _mark_task(task_id, "error", "driver setup failed")
-        return
-    if not bot.login(email, password):
-        _mark_task(task_id, "error", "login failed")
-        bot.close()
-        return
-    if keyword:
-        sent = bot.search_and_connect_by_keyword(keyword, max_connections)
-    else:
-        sent = bot.run_auto_connection_campaign(total_connections=max_connections) or 0
-    bot.close()
-    _mark_task(task_id, "completed", f"connections attempted: {sent}")
+def _wants_json():
+    return (request.args.get("format") == "json") or ("application/json" in (request.headers.get("Accept") or ""))
 
-def run_messaging(email, password, gemini_key, task_id=None):
-    ok = start_messaging_bot(email, password, gemini_key)
-    _mark_task(task_id, "completed" if ok else "error", "messaging exited")
+def _queue_full():
+    if _wants_json():
+        return jsonify({"error": "job queue is full, try again later"}), 429
+    flash("Job queue is full, try again later", "error")
+    return render_template("index_golden.html"), 429
 
 @app.route("/", methods=["GET"]) 
 def index():
@@ -68,14 +147,66 @@ def post():
     openai_key = request.form.get("openai_key", "").strip()
     industry = request.form.get("industry", "tech").strip()
     topic = request.form.get("topic", "").strip()
+    draft_id = request.form.get("draft_id", "").strip() or None
     if not email or not password:
         flash("Email and password required", "error")
         return redirect(url_for("dashboard"))
-    task = _create_task("post", {"email": email, "industry": industry, "topic": topic})
-    threading.Thread(target=run_post, args=(email, password, openai_key, industry, topic, task["id"] if isinstance(task, dict) else task), daemon=True).start()
+    draft = DRAFT_CACHE.get(draft_id) if draft_id else None
+    if draft_id and draft is None:
+        if _wants_json():
+            return jsonify({"error": "draft expired or already posted, preview again"}), 404
+        flash("Draft expired or already posted, preview again", "error")
+        return redirect(url_for("dashboard"))
+    payload = {"email": email, "industry": industry, "topic": topic, "draft_id": draft_id}
+    task = _submit_task("post", payload, run_post, email, password, openai_key, industry, topic, draft_id, draft)
+    if task is None:
+        return _queue_full()
     flash("Post task started", "info")
     return redirect(url_for("dashboard"))
 
+def _preview_events(openai_key, industry, topic):
+    from app import LinkedInAgent
+    from llm_client import LLMError
+    agent = LinkedInAgent("", "", openai_api_key=openai_key)
+    pieces = []
+    if openai_key:
+        try:
+            for piece in agent.stream_content(industry, topic):
+                pieces.append(piece)
+                yield sse_frame("token", {"text": piece})
+        except LLMError as e:
+            if pieces:
+                yield sse_frame("error", {"error": f"generation failed: {e}"})
+                return
+            logging.getLogger("linkedin_agent").warning(f"Draft preview generation failed, using a template: {e}")
+    if pieces:
+        text, source = agent.clean_content("".join(pieces)), "ai"
+    else:
+        # same fallbacks as a post task without a key or with a failing provider
+        text = agent.generate_topic_content(industry, topic) if topic and not openai_key else agent.generate_template_content(industry)
+        source = "template"
+        yield sse_frame("token", {"text": text})
+    draft_id = DRAFT_CACHE.put(text, industry=industry, topic=topic, source=source)
+    yield sse_frame("draft", {"id": draft_id, "text": text, "source": source, "expires_in": DRAFT_CACHE.ttl})
+
+@app.route("/drafts/preview", methods=["POST"]) 
+def preview_draft():
+    # event stream over a POST (read with fetch, not EventSource) so the API key stays out of URLs and logs
+    form = request.get_json(silent=True) or request.form
+    openai_key = (form.get("openai_key") or "").strip()
+    industry = (form.get("industry") or "tech").strip()
+    topic = (form.get("topic") or "").strip()
+    if not PREVIEW_STREAMS.acquire(blocking=False):
+        return jsonify({"error": "too many previews in progress, try again shortly"}), 503, {"Retry-After": "5"}
+    resp = Response(
+        stream_with_context(_preview_events(openai_key, industry, topic)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # runs even when the client goes away before the stream starts
+    resp.call_on_close(PREVIEW_STREAMS.release)
+    return resp
+
 @app.route("/connect", methods=["POST"]) 
 def connect():
     email = request.form.get("email", "").strip()
@@ -85,10 +216,10 @@ def connect():
     if not email or not password:
         flash("Email and password required", "error")
         return redirect(url_for("dashboard"))
-    task = _create_task("connect", {"email": email, "keyword": keyword, "max": max_connections})
-    threading.Thread(target=run_connect, args=(email, password, keyword, max_connections, task["id"] if isinstance(task, dict) else task), daemon=True).start()
-    wants_json = (request.args.get("format") == "json") or ("application/json" in (request.headers.get("Accept") or ""))
-    if wants_json:
+    task = _submit_task("connect", {"email": email, "keyword": keyword, "max": max_connections}, run_connect, email, password, keyword, max_connections)
+    if task is None:
+        return _queue_full()
+    if _wants_json():
         return jsonify({"task_id": task["id"], "status_url": url_for("status", _external=True)}), 202
     flash("Connection task started", "info")
     return redirect(url_for("index"))
@@ -101,39 +232,118 @@ def messaging():
     if not email or not password:
         flash("Email and password required", "error")
         return redirect(url_for("index"))
-    task = _create_task("messaging", {"email": email})
-    threading.Thread(target=run_messaging, args=(email, password, gemini_key, task["id"] if isinstance(task, dict) else task), daemon=True).start()
+    task = _submit_task("messaging", {"email": email}, run_messaging, email, password, gemini_key)
+    if task is None:
+        return _queue_full()
     flash("Messaging bot started", "info")
     return redirect(url_for("dashboard"))
 
-def _mark_task(task_id, status, message):
-    try:
-        for kind in TASKS:
-            for t in TASKS[kind]:
-                if t.get("id") == task_id:
-                    t["status"] = status
-                    t["message"] = message
-                    return
-    except Exception:
-        pass
+@app.route("/tasks/<int:task_id>/cancel", methods=["POST"]) 
+def cancel_task(task_id):
+    task = TASKS.get(task_id)
+    if task is None:
+        return jsonify({"error": "unknown task"}), 404
+    if task["status"] in FINISHED_STATUSES:
+        return jsonify({"error": "task has already finished"}), 409
+    if not EXECUTOR.cancel(task_id):
+        # another worker runs it; its executor picks the request up from the shared registry
+        TASKS.update(task_id, cancel_requested="cancelled by user")
+    return jsonify({"task_id": task_id, "status_url": url_for("status", _external=True)}), 202
+
+@app.route("/tasks/<int:task_id>/logs", methods=["GET"]) 
+def task_logs(task_id):
+    after = request.args.get("after", 0, type=int)
+    result = TASK_LOGS.read(task_id, after)
+    if result is None:
+        if TASKS.get(task_id) is None:
+            return jsonify({"error": "unknown task"}), 404
+        return jsonify({"task_id": task_id, "lines": [], "next": after, "truncated": False})
+    lines, next_seq, truncated = result
+    return jsonify({"task_id": task_id, "lines": lines, "next": next_seq, "truncated": truncated})
+
+@app.route("/metrics", methods=["GET"]) 
+def metrics():
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/status", methods=["GET"]) 
 def status():
-    return jsonify(TASKS)
+    since = request.args.get("since", type=int)
+    scope = "all" if since is None else since
+    current = f"tasks-{TASKS.version}-{scope}"
+    if request.if_none_match.contains(current):
+        return "", 304, {"ETag": f'"{current}"', "Cache-Control": "no-cache"}
+    delta = TASKS.changes(since) if since is not None else None
+    if delta is not None:
+        version, changed, removed = delta
+        body = {"version": version, "since": since, "delta": True, "tasks": changed, "removed": removed}
+    else:
+        version, body = TASKS.snapshot()
+        body.update({"version": version, "delta": False})
+    resp = jsonify(body)
+    resp.set_etag(f"tasks-{version}-{scope}")
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+def _shared_task_poll(version):
+    """
+    /events poll for a shared TASK_DB: other workers' task changes never reach
+    this worker's broker, so send them as a /status-style delta when the
+    registry version moves.
+    """
+    state = {"version": version}
+
+    def poll():
+        current = TASKS.version
+        if current == state["version"]:
+            return []
+        delta = TASKS.changes(state["version"])
+        if delta is None:
+            current, body = TASKS.snapshot()
+            body.update({"version": current, "delta": False})
+        else:
+            current, changed, removed = delta
+            body = {"version": current, "since": state["version"], "delta": True, "tasks": changed, "removed": removed}
+        state["version"] = current
+        return [sse_frame("snapshot", body)]
+
+    return poll
+
+@app.route("/events", methods=["GET"]) 
+def events():
+    # subscribe before snapshotting so no transition is lost; clients merge by task version
+    try:
+        sub = EVENTS.subscribe()
+    except BrokerFull:
+        # the page polls /status and /logs instead
+        return jsonify({"error": "too many event streams open"}), 503, {"Retry-After": "30"}
+    version, tasks = TASKS.snapshot()
+    tasks.update({"version": version, "delta": False})
+    sub.send("snapshot", tasks)
+    poll = _shared_task_poll(version) if os.environ.get("TASK_DB") else None
+    resp = Response(
+        stream_with_context(sub.stream(poll=poll, poll_interval=float(os.environ.get("EVENTS_POLL_INTERVAL", "2")))),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # free the slot even if the client disconnects before the stream starts
+    resp.call_on_close(lambda: EVENTS.unsubscribe(sub))
+    return resp
 
 @app.route("/logs", methods=["GET"]) 
 def logs():
-    def tail(path, max_chars=6000):
-        try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                data = f.read()
-                return data[-max_chars:]
-        except Exception:
-            return ""
-    return jsonify({
-        "agent": tail("linkedin_agent.log"),
-        "connect": tail("linkedin_connect.log")
-    })
+    body = {}
+    for name, path in (("agent", "linkedin_agent.log"), ("connect", "linkedin_connect.log")):
+        offset = request.args.get(f"{name}_offset", type=int)
+        if offset is None:
+            text, end, inode = tail(path)
+            reset = True
+        else:
+            text, end, inode, reset = read_since(path, offset, request.args.get(f"{name}_inode", type=int))
+        body[name] = text
+        body[f"{name}_offset"] = end
+        body[f"{name}_inode"] = inode
+        body[f"{name}_reset"] = reset
+    return jsonify(body)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
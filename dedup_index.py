@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger("linkedin_agent")
+
+_VALUE_BITS = 57
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=3):
+    """Set of word n-grams of a lower-cased text (the whole text when it is shorter than size words)"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _stable_hash(value):
+    # Python's hash() is salted per process, which would make stored signatures meaningless
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index over posted text.
+
+    Each text becomes a num_perm MinHash signature of its word shingles,
+    computed with one-permutation hashing (each shingle hash lands in one
+    of num_perm bins, keeping the bin minimum; empty bins borrow from their
+    right neighbour), so signing is a single pass over the shingles. The
+    signature is split into `bands` buckets so a lookup only compares
+    against posts sharing a bucket, keeping queries fast no matter how long
+    the history. The estimated Jaccard similarity of those candidates is
+    compared with `threshold`. With a path, entries are appended to a JSONL
+    file, reloaded on start and picked up from other processes on query.
+    """
+
+    def __init__(self, path=None, num_perm=64, bands=16, threshold=0.6, shingle_size=3):
+        if num_perm % bands or num_perm & (num_perm - 1):
+            raise ValueError("num_perm must be a power of two and a multiple of bands")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self._lock = threading.Lock()
+        self._entries = []
+        self._buckets = {}
+        self._offset = 0
+
+    def signature(self, text):
+        bins = [None] * self.num_perm
+        mask = self.num_perm - 1
+        for s in shingles(text, self.shingle_size):
+            h = _stable_hash(s)
+            b, value = h & mask, h >> (64 - _VALUE_BITS)
+            if bins[b] is None or value < bins[b]:
+                bins[b] = value
+        filled = [i for i, value in enumerate(bins) if value is not None]
+        if not filled:
+            return (0,) * self.num_perm
+        # densify by rotation: an empty bin takes the next filled bin's value, offset by the distance
+        signature = list(bins)
+        for i in range(self.num_perm):
+            if bins[i] is None:
+                j = next((f for f in filled if f > i), filled[0])
+                signature[i] = bins[j] + ((j - i) % self.num_perm << _VALUE_BITS)
+        return tuple(signature)
+
+    def _band_keys(self, signature):
+        return [(i, signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def _insert(self, entry):
+        index = len(self._entries)
+        self._entries.append(entry)
+        for key in self._band_keys(entry["signature"]):
+            self._buckets.setdefault(key, []).append(index)
+
+    def _refresh(self):
+        """Pick up entries appended to the file (by this or another process) since the last read"""
+        if not self.path:
+            return
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        # only consume complete lines; a concurrent writer may be mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+                sig = record.pop("sig")
+                record["signature"] = tuple(int(sig[i:i + 16], 16) for i in range(0, len(sig), 16))
+            except (ValueError, KeyError, TypeError):
+                continue
+            if len(record["signature"]) == self.num_perm:
+                self._insert(record)
+        self._offset += end
+
+    def similar(self, text, signature=None):
+        """[(similarity, entry), ...] above the threshold, most similar first"""
+        signature = signature or self.signature(text)
+        with self._lock:
+            self._refresh()
+            candidates = {i for key in self._band_keys(signature) for i in self._buckets.get(key, ())}
+            matches = []
+            for i in candidates:
+                entry = self._entries[i]
+                score = sum(x == y for x, y in zip(signature, entry["signature"])) / self.num_perm
+                if score >= self.threshold:
+                    matches.append((score, entry))
+        return sorted(matches, key=lambda m: m[0], reverse=True)
+
+    def is_duplicate(self, text):
+        return bool(self.similar(text))
+
+    def add(self, text, **meta):
+        signature = self.signature(text)
+        entry = {"posted_at": time.time(), "preview": text[:80], **meta, "signature": signature}
+        with self._lock:
+            if not self.path:
+                self._insert(entry)
+                return
+            record = {k: v for k, v in entry.items() if k != "signature"}
+            record["sig"] = "".join(f"{x:016x}" for x in signature)
+            try:
+                # one append per line keeps concurrent writers from interleaving; the refresh indexes it
+                with open(self.path, "ab") as f:
+                    f.write((json.dumps(record) + "\n").encode("utf-8"))
+            except OSError as e:
+                logger.warning(f"Could not persist post fingerprint: {e}")
+                self._insert(entry)
+                return
+            self._refresh()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_index():
+    """Process-wide index of posted content from DEDUP_INDEX_PATH and DEDUP_THRESHOLD"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = NearDuplicateIndex(
+                path=os.environ.get("DEDUP_INDEX_PATH", "posted_index.jsonl"),
+                threshold=float(os.environ.get("DEDUP_THRESHOLD", "0.6")),
+            )
+        return _default
@@ -0,0 +1,239 @@
+import os
+import json
+import queue
+import time
+import fcntl
+import hashlib
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+
+from metrics import REGISTRY, Counter
+
+logger = logging.getLogger("linkedin_agent")
+
+DRAFTS_SERVED = REGISTRY.register(Counter(
+    "linkedin_drafts_served_total",
+    "Post drafts requested from the buffer: hit (served pre-generated) or miss (generated live)",
+    ("industry", "result"),
+))
+
+
+@contextmanager
+def _locked_json(path):
+    """The JSON object stored at path under an exclusive flock; changes are written back on exit"""
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        before = json.dumps(data, sort_keys=True)
+        yield data
+        if json.dumps(data, sort_keys=True) != before:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, path)
+
+
+def _generate_with_openai(industry, api_key):
+    # imported here so the dashboard does not load the job modules at startup
+    from app import LinkedInAgent
+
+    return LinkedInAgent("", "", openai_api_key=api_key).generate_ai_content(industry)
+
+
+class DraftBuffer:
+    """
+    Small per-industry stock of AI-written post drafts, already cleaned, so
+    a post task does not wait on the LLM.
+
+    take() pops the oldest fresh draft and asks a background producer to
+    top that industry back up to `size` for the same key. The producer only
+    works on such requests (and, from start(), once for the configured
+    industries with OPENAI_API_KEY): it never refills on a timer, and a
+    user's key is dropped as soon as its refill is done, so no LLM calls are
+    made with a key after its owner stops posting. Drafts older than `ttl`
+    seconds are dropped. With a path the stock lives in a JSON file guarded
+    by flock, so gunicorn workers share it and it survives restarts; API
+    keys are never written to it.
+    """
+
+    def __init__(self, path=None, size=3, ttl=86400, generate=_generate_with_openai, industries=()):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self.generate = generate
+        self._lock = threading.Lock()
+        self._drafts = {}
+        self.industries = tuple(industries)
+        self._requests = queue.SimpleQueue()
+        self._thread = None
+
+    @contextmanager
+    def _stock(self):
+        """The {industry: [draft, ...]} stock, locked; changes are written back on exit"""
+        with self._lock:
+            if not self.path:
+                yield self._drafts
+                return
+            with _locked_json(self.path) as drafts:
+                yield drafts
+
+    def _expire(self, drafts):
+        cutoff = time.time() - self.ttl
+        for industry in list(drafts):
+            drafts[industry] = [d for d in drafts[industry] if d["created_at"] >= cutoff]
+
+    def take(self, industry, api_key=None, refill=True):
+        """A ready draft for industry, or None; unless refill is False a refill is scheduled"""
+        if self.size <= 0:
+            return None
+        key_id = self._key_id(api_key)
+        text = None
+        with self._stock() as drafts:
+            self._expire(drafts)
+            pool = drafts.get(industry, [])
+            # a draft is only served to the key that paid for it
+            for i, draft in enumerate(pool):
+                if draft.get("key") == key_id:
+                    del pool[i]
+                    text = draft["text"]
+                    break
+        DRAFTS_SERVED.inc(industry=industry, result="hit" if text is not None else "miss")
+        if refill:
+            self._refill(industry, api_key)
+        return text
+
+    def stats(self):
+        with self._stock() as drafts:
+            self._expire(drafts)
+            return {industry: len(pool) for industry, pool in drafts.items()}
+
+    @staticmethod
+    def _key_id(api_key):
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+    def _refill(self, industry, api_key):
+        if not api_key:
+            return
+        self._requests.put((industry, api_key))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="draft-buffer", daemon=True)
+                self._thread.start()
+
+    def start(self):
+        """Fill the industries given at construction once, with OPENAI_API_KEY if it is set"""
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if self.size > 0:
+            for industry in self.industries:
+                self._refill(industry, api_key)
+        return self
+
+    def _missing(self, industry, api_key):
+        with self._stock() as drafts:
+            self._expire(drafts)
+            return self.size - sum(d.get("key") == self._key_id(api_key) for d in drafts.get(industry, []))
+
+    def _add(self, industry, api_key, text):
+        with self._stock() as drafts:
+            pool = drafts.setdefault(industry, [])
+            if sum(d.get("key") == self._key_id(api_key) for d in pool) < self.size:
+                pool.append({"text": text, "created_at": time.time(), "key": self._key_id(api_key)})
+
+    def _run(self):
+        while True:
+            industry, api_key = self._requests.get()
+            try:
+                while self._missing(industry, api_key) > 0:
+                    self._add(industry, api_key, self.generate(industry, api_key))
+            except Exception as e:
+                # the next take() asks again; the LLM client's breaker handles outages
+                logger.warning(f"Draft pre-generation failed for {industry}: {e}")
+            # the key is not kept once its refill is done
+            industry = api_key = None
+
+
+class DraftCache:
+    """
+    Short-lived drafts a reviewer has already seen (from /drafts/preview),
+    kept under an opaque id so a later post can use the exact text without
+    another LLM call. Entries expire after `ttl` seconds; with a path they
+    live in a flock-guarded JSON file shared by gunicorn workers.
+    """
+
+    def __init__(self, path=None, ttl=900):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._drafts = {}
+
+    @contextmanager
+    def _entries(self):
+        with self._lock:
+            if not self.path:
+                entries = self._drafts
+                self._expire(entries)
+                yield entries
+                return
+            with _locked_json(self.path) as entries:
+                self._expire(entries)
+                yield entries
+
+    def _expire(self, entries):
+        cutoff = time.time() - self.ttl
+        for draft_id in [k for k, v in entries.items() if v["created_at"] < cutoff]:
+            del entries[draft_id]
+
+    def put(self, text, **meta):
+        """Store text and return its id"""
+        draft_id = secrets.token_urlsafe(12)
+        with self._entries() as entries:
+            entries[draft_id] = {**meta, "text": text, "created_at": time.time()}
+        return draft_id
+
+    def get(self, draft_id):
+        """The draft's text, or None once it has expired or been used"""
+        with self._entries() as entries:
+            entry = entries.get(draft_id)
+            return entry["text"] if entry else None
+
+    def discard(self, draft_id):
+        with self._entries() as entries:
+            entries.pop(draft_id, None)
+
+
+_default = None
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_buffer():
+    """Process-wide DraftBuffer configured from DRAFT_BUFFER_SIZE, DRAFT_TTL and DRAFT_BUFFER_PATH"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            industries = [i.strip() for i in os.environ.get("DRAFT_INDUSTRIES", "tech").split(",") if i.strip()]
+            _default = DraftBuffer(
+                path=os.environ.get("DRAFT_BUFFER_PATH", "drafts.json"),
+                size=int(os.environ.get("DRAFT_BUFFER_SIZE", "3")),
+                ttl=float(os.environ.get("DRAFT_TTL", "86400")),
+                industries=industries,
+            )
+        return _default
+
+
+def default_cache():
+    """Process-wide DraftCache configured from DRAFT_CACHE_PATH and DRAFT_CACHE_TTL"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DraftCache(
+                path=os.environ.get("DRAFT_CACHE_PATH", "draft_cache.json"),
+                ttl=float(os.environ.get("DRAFT_CACHE_TTL", "900")),
+            )
+        return _default_cache
@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+
+from metrics import PHASE_SECONDS
+from resource_monitor import register_driver
+
+logger = logging.getLogger("linkedin_agent")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# images, media and web fonts: nothing the automation reads, most of what a feed page downloads
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.avif",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*://media.licdn.com/*", "*://dms.licdn.com/*",
+]
+
+LEAN_ARGUMENTS = [
+    "--window-size=1280,800",
+    "--renderer-process-limit=2",
+    "--blink-settings=imagesEnabled=false",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-extensions",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-component-update",
+    "--disable-background-networking",
+    "--disable-breakpad",
+    "--disable-notifications",
+    "--metrics-recording-only",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions",
+]
+
+
+def chrome_options(profile="lean", user_agent=USER_AGENT):
+    """Headless Chrome options; the lean profile trims everything a text-only automation does not need"""
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--headless")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
+    options.add_experimental_option("useAutomationExtension", False)
+    if user_agent:
+        options.add_argument(f"--user-agent={user_agent}")
+    if profile == "lean":
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+    else:
+        options.add_argument("--start-maximized")
+    return options
+
+
+def _block_urls(driver, patterns):
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logger.warning(f"Could not enable URL blocking: {e}")
+
+
+def create_driver(profile=None, user_agent=USER_AGENT):
+    """
+    Start Chrome with the given profile (default: CHROME_PROFILE, "lean";
+    "full" keeps images and background features). Startup time is logged
+    and recorded as the driver_startup phase, and the driver is registered
+    with the resource monitor for the current task.
+    """
+    from selenium import webdriver
+
+    profile = profile or os.environ.get("CHROME_PROFILE", "lean")
+    start = time.perf_counter()
+    driver = webdriver.Chrome(options=chrome_options(profile, user_agent))
+    try:
+        register_driver(driver)
+        if profile == "lean":
+            _block_urls(driver, BLOCKED_URLS)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    except Exception:
+        driver.quit()
+        raise
+    elapsed = time.perf_counter() - start
+    PHASE_SECONDS.observe(elapsed, phase="driver_startup")
+    logger.info(f"Chrome started in {elapsed:.2f}s ({profile} profile)")
+    return driver
+
+
+_pool = None
+
+
+def use_pool(pool):
+    """Serve acquire_driver() from a BrowserPool (None to start every browser cold)"""
+    global _pool
+    _pool = pool
+
+
+def acquire_driver():
+    """A browser for the current task: a warm standby when a pool is configured, else a fresh one"""
+    if _pool is not None:
+        return _pool.acquire()
+    return create_driver()
+
+
+def release_driver(driver, reuse=True):
+    """Hand a browser back to the pool, or quit it; reuse=False always quits"""
+    if _pool is not None:
+        _pool.release(driver, reuse=reuse)
+        return
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def release_task_driver(driver, cancel_token):
+    """
+    Release the browser a task was using, if any. A cancelled task may have
+    left it mid-action (half-typed post, open dialog), so it is quit rather
+    than handed back to the pool.
+    """
+    if driver is not None:
+        release_driver(driver, reuse=not cancel_token.cancelled)
@@ -0,0 +1,135 @@
+import json
+import time
+import queue
+import logging
+import threading
+import itertools
+
+_CLOSED = object()
+
+
+class BrokerFull(Exception):
+    """Raised by subscribe() when the broker already has max_subscribers streams open"""
+
+
+def sse_frame(event, data, event_id=None):
+    """One Server-Sent Events frame carrying data as JSON"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscriber:
+    """One /events client with a bounded buffer"""
+
+    def __init__(self, broker, maxsize):
+        self.broker = broker
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def send(self, event, data):
+        """Queue an event for this subscriber only"""
+        return self.offer(self.broker._frame(event, data))
+
+    def offer(self, item):
+        """Enqueue without blocking; a full buffer drops the subscriber"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
+
+    def stream(self, heartbeat=15, poll=None, poll_interval=2):
+        """
+        Yield SSE frames until the client goes away or falls too far behind.
+        With poll, poll() is called every poll_interval seconds and the frames
+        it returns are sent too (changes this process is not told about).
+        """
+        wait = min(heartbeat, poll_interval) if poll else heartbeat
+        last_sent = last_poll = time.monotonic()
+        try:
+            while not self.dropped:
+                try:
+                    item = self.queue.get(timeout=wait)
+                except queue.Empty:
+                    item = None
+                if item is _CLOSED:
+                    break
+                frames = [item] if item is not None else []
+                now = time.monotonic()
+                if poll and now - last_poll >= poll_interval:
+                    last_poll = now
+                    frames += poll()
+                if not frames and now - last_sent >= heartbeat:
+                    frames = [": keepalive\n\n"]
+                for frame in frames:
+                    yield frame
+                if frames:
+                    last_sent = now
+        finally:
+            self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fan out task and log events to Server-Sent Events subscribers"""
+
+    def __init__(self, buffer_size=256, max_subscribers=None):
+        self.buffer_size = buffer_size
+        # each open stream holds a server thread for as long as the page stays open
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        sub = Subscriber(self, self.buffer_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull(f"{len(self._subscribers)} event streams already open")
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event, data):
+        """Send an event to every subscriber; never blocks the caller"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        frame = self._frame(event, data)
+        for sub in subscribers:
+            if not sub.offer(frame):
+                self.unsubscribe(sub)
+
+    def close(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for sub in subscribers:
+            sub.offer(_CLOSED)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _frame(self, event, data):
+        return sse_frame(event, data, next(self._ids))
+
+
+class BrokerLogHandler(logging.Handler):
+    """Publish formatted log records as `log` events"""
+
+    def __init__(self, broker, channel, level=logging.INFO):
+        super().__init__(level)
+        self.broker = broker
+        self.channel = channel
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        try:
+            self.broker.publish("log", {"channel": self.channel, "line": self.format(record)})
+        except Exception:
+            self.handleError(record)
@@ -0,0 +1,200 @@
+"""
+Local stand-in for the LinkedIn pages the browser flows touch.
+
+Serves saved snapshots of the login, feed (with the share modal) and
+messaging pages from fixtures/, using the same ids and classes the
+automation looks for, plus just enough behaviour to drive them: the login
+form sets a session cookie, feed and messaging redirect to /login without
+it, and posts and sent messages are recorded. /v1/chat/completions answers
+like an OpenAI-compatible endpoint, streaming when asked to.
+
+    python fixture_server.py --port 8765
+    LINKEDIN_BASE_URL=http://127.0.0.1:8765 python app.py
+"""
+import os
+import json
+import time
+import secrets
+import argparse
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SESSION_COOKIE = "li_at"
+
+PAGES = {
+    "/login": ("login.html", False),
+    "/feed/": ("feed.html", True),
+    "/messaging/": ("messaging.html", True),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FixtureServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _path(self):
+        return self.path.split("?", 1)[0]
+
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return morsel is not None and morsel.value in self.server.sessions
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, location, headers=()):
+        self._send(303, headers=[("Location", location), *headers])
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8", errors="replace") if length else ""
+
+    def do_GET(self):
+        path = self._path()
+        if path == "/robots.txt":
+            return self._send(200, b"User-agent: *\nDisallow:\n", "text/plain")
+        if path == "/api/state":
+            with self.server.lock:
+                state = {"posts": list(self.server.posts), "messages": list(self.server.messages)}
+            return self._send(200, json.dumps(state).encode("utf-8"), "application/json")
+        if path in PAGES:
+            name, needs_session = PAGES[path]
+            if needs_session and not self._session():
+                return self._redirect(f"/login?session_redirect={path}")
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                return self._send(200, f.read())
+        self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        path = self._path()
+        body = self._body()
+        if path == "/checkpoint/lg/login-submit":
+            token = secrets.token_hex(16)
+            with self.server.lock:
+                self.server.sessions.add(token)
+            return self._redirect("/feed/", [("Set-Cookie", f"{SESSION_COOKIE}={token}; Path=/; HttpOnly")])
+        if path == "/v1/chat/completions":
+            return self._chat_completion(body)
+        if path in ("/api/posts", "/api/messages") and self._session():
+            with self.server.lock:
+                (self.server.posts if path == "/api/posts" else self.server.messages).append(body)
+            return self._send(201, b"{}", "application/json")
+        self._send(404, b"not found", "text/plain")
+
+    def _chat_completion(self, body):
+        # OpenAI-compatible stand-in so llm_client's HTTP path runs offline (OPENAI_BASE_URL=<url>/v1)
+        try:
+            request = json.loads(body)
+            messages = request["messages"]
+        except (ValueError, KeyError, TypeError):
+            return self._send(400, b'{"error": "bad request"}', "application/json")
+        with self.server.lock:
+            self.server.completions += 1
+            n = self.server.completions
+        text = (f"Fixture post #{n}: small teams ship faster when feedback loops are short. "
+                "What is one loop you shortened this year? #Engineering #Productivity")
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+        if request.get("stream"):
+            return self._chat_stream(text, prompt_tokens)
+        reply = {
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text.split())},
+        }
+        self._send(200, json.dumps(reply).encode("utf-8"), "application/json")
+
+    def _chat_stream(self, text, prompt_tokens):
+        # "stream": true answers as server-sent chunks, one word each, ending with usage and [DONE]
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.close_connection = True
+        words = text.split(" ")
+        events = [{"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                  for i, word in enumerate(words)]
+        events.append({"choices": [], "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words)}})
+        for event in events:
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class FixtureServer:
+    """Threaded fixture server on host:port (port 0 picks a free one); latency delays every response"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.lock = threading.Lock()
+        self.httpd.sessions = set()
+        self.httpd.posts = []
+        self.httpd.messages = []
+        self.httpd.completions = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def posts(self):
+        with self.httpd.lock:
+            return list(self.httpd.posts)
+
+    @property
+    def messages(self):
+        with self.httpd.lock:
+            return list(self.httpd.messages)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the offline LinkedIn page fixtures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to delay every response")
+    args = parser.parse_args()
+    server = FixtureServer(args.host, args.port, args.latency)
+    print(f"Serving fixtures on {server.url} (LINKEDIN_BASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
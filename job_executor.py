@@ -0,0 +1,179 @@
+import time
+import threading
+from collections import deque
+
+from cancellation import CancelToken
+from process_runner import run_inline
+import resource_monitor
+from logging_setup import set_task_id
+from metrics import REGISTRY, Counter
+
+JOBS_FINISHED = REGISTRY.register(Counter(
+    "linkedin_jobs_finished_total", "Jobs that reached a final status", ("kind", "status"),
+))
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the wait queue is at its limit"""
+
+
+class JobExecutor:
+    """
+    Run browser jobs on a fixed number of worker threads with a bounded FIFO queue.
+
+    Every job launches its own Chrome, so max_workers caps how many browser
+    sessions run at once. Waiting jobs are reported to the task registry as
+    "queued" with a 1-based queue_position.
+
+    Jobs receive a CancelToken as their `cancel_token` keyword argument and
+    return (status, message), which is recorded on the task. A job that is
+    cancelled or outlives its timeout is asked to stop, and after `grace`
+    seconds its cleanup callbacks (driver.quit) are forced.
+
+    runner decides where a job executes: run_inline (this thread, default)
+    or a process_runner.ProcessRunner. With a monitor, browser processes the
+    job registers are sampled and reported on the task.
+
+    With cancel_poll (seconds), the registry is checked that often for a
+    `cancel_requested` reason on this executor's jobs, so a cancel handled by
+    another process sharing the registry still stops them.
+    """
+
+    def __init__(self, registry, max_workers=2, max_queue=10, grace=10, runner=run_inline, monitor=None,
+                 cancel_poll=None):
+        self.registry = registry
+        self.runner = runner
+        self.monitor = monitor
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.grace = grace
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._workers = []
+        self._active = 0
+        self._tokens = {}
+        self.cancel_poll = cancel_poll
+        self._watcher = None
+
+    def submit(self, task_id, fn, *args, timeout=None):
+        """
+        Queue fn(*args, cancel_token=...) for task_id.
+
+        Raises QueueFull when the queue is at its limit. timeout is the
+        maximum runtime in seconds, counted from when the job starts.
+        """
+        with self._cond:
+            if len(self._queue) >= self.max_workers - self._active + self.max_queue:
+                raise QueueFull(f"{len(self._queue)} jobs already waiting")
+            self._queue.append((task_id, fn, args, timeout))
+            if len(self._queue) > len(self._workers) - self._active and len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f"job-worker-{len(self._workers) + 1}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._update_positions()
+            self._cond.notify()
+            if self.cancel_poll and self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch_cancel_requests, name="job-cancel-watcher", daemon=True)
+                self._watcher.start()
+
+    def _watch_cancel_requests(self):
+        while True:
+            time.sleep(self.cancel_poll)
+            with self._cond:
+                owned = [job[0] for job in self._queue] + list(self._tokens)
+            for task_id in owned:
+                try:
+                    task = self.registry.get(task_id)
+                except Exception:
+                    continue
+                if task and task.get("cancel_requested"):
+                    self.cancel(task_id, task["cancel_requested"])
+
+    def cancel(self, task_id, reason="cancelled by user"):
+        """Cancel a queued or running job; returns False if this executor does not own it"""
+        with self._cond:
+            for job in self._queue:
+                if job[0] == task_id:
+                    self._queue.remove(job)
+                    self._update_positions()
+                    self._finish(task_id, "cancelled", reason, queue_position=None)
+                    return True
+            token = self._tokens.get(task_id)
+        if token is None:
+            return False
+        self._stop(task_id, token, reason)
+        return True
+
+    @property
+    def depth(self):
+        """Number of jobs waiting for a free browser slot"""
+        with self._cond:
+            return len(self._queue)
+
+    @property
+    def active(self):
+        """Number of jobs currently running"""
+        with self._cond:
+            return self._active
+
+    def _update_positions(self):
+        for position, job in enumerate(self._queue, 1):
+            self.registry.mark(job[0], "queued", "waiting for a browser slot", queue_position=position)
+
+    def _finish(self, task_id, status, message, **fields):
+        task = self.registry.mark(task_id, status, message, **fields)
+        if task is not None:
+            JOBS_FINISHED.inc(kind=task["kind"], status=status)
+
+    def _stop(self, task_id, token, reason):
+        # only while the job is still ours: once the worker has dropped the token its final status stands
+        with self._cond:
+            if token.cancelled or self._tokens.get(task_id) is not token:
+                return
+            token.cancel(reason)
+            self.registry.mark(task_id, "cancelling", reason)
+        timer = threading.Timer(self.grace, token.force)
+        timer.daemon = True
+        timer.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                task_id, fn, args, timeout = self._queue.popleft()
+                token = CancelToken()
+                self._tokens[task_id] = token
+                self._active += 1
+                self._update_positions()
+            self.registry.mark(task_id, "running", "", queue_position=None)
+            deadline = None
+            if timeout:
+                deadline = threading.Timer(timeout, self._stop, (task_id, token, f"timed out after {timeout:g}s"))
+                deadline.daemon = True
+                deadline.start()
+            resource_monitor.bind(self.monitor, task_id)
+            set_task_id(task_id)
+            outcome = ("error", "job exited unexpectedly")
+            try:
+                outcome = self.runner(fn, args, token) or ("completed", "")
+            except Exception as e:
+                outcome = ("error", f"{type(e).__name__}: {e}")
+            finally:
+                resource_monitor.bind(None, None)
+                set_task_id(None)
+                if self.monitor is not None:
+                    self.monitor.release(task_id)
+                if deadline is not None:
+                    deadline.cancel()
+                # whatever the job did, make sure its browser is gone
+                token.force()
+                # after the token is dropped _stop() can no longer mark the task, so this status is final
+                with self._cond:
+                    self._tokens.pop(task_id, None)
+                    self._active -= 1
+                    cancelled = token.cancelled
+                if cancelled:
+                    self._finish(task_id, "cancelled", token.reason)
+                else:
+                    self._finish(task_id, *outcome)
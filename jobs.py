@@ -0,0 +1,72 @@
+"""
+Task entry points run by the dashboard's JobExecutor.
+
+With JOB_ISOLATION=process these functions are pickled into a spawned
+child, which imports this module rather than the dashboard, so nothing
+here may have import-time side effects (logging setup, background
+threads, standby browsers). The job modules pull in selenium and
+friends, so they are imported when a job runs, not at startup.
+"""
+import multiprocessing
+
+from draft_buffer import default_buffer, default_cache
+
+
+def _in_job_process():
+    # a process-isolated job exits with its job, so a draft producer started there would be killed mid-call
+    return multiprocessing.parent_process() is not None
+
+
+def run_post(email, password, openai_key, industry, topic, draft_id=None, draft=None, cancel_token=None):
+    from app import LinkedInAgent
+    agent = LinkedInAgent(email=email, password=password, openai_api_key=openai_key, cancel_token=cancel_token)
+    try:
+        agent.setup_driver()
+        if not agent.login():
+            return "error", "login failed"
+        if draft:
+            # the reviewer approved this exact text; never swap in an unseen regeneration
+            if agent.ensure_unique(draft, None, attempts=0) is None:
+                return "error", "the previewed draft is a near-duplicate of an earlier post"
+            if not agent.create_post(draft):
+                # keep the approved text so the reviewer can retry it
+                return "error", "post failed"
+            default_cache().discard(draft_id)
+            return "completed", "post created from previewed draft"
+        if topic:
+            content = agent.generate_topic_content(industry, topic)
+        else:
+            draft = openai_key and default_buffer().take(industry, openai_key, refill=not _in_job_process())
+            content = draft or agent.generate_unique_content(industry)
+        regenerate = (lambda: agent.generate_topic_content(industry, topic)) if topic else (lambda: agent.generate_unique_content(industry))
+        content = agent.ensure_unique(content, regenerate)
+        if content is None:
+            return "error", "every draft was a near-duplicate of an earlier post"
+        if not agent.create_post(content):
+            return "error", "post failed"
+    finally:
+        agent.close()
+    return "completed", "post created"
+
+
+def run_connect(email, password, keyword, max_connections, cancel_token=None):
+    from linkedin_auto_connect import LinkedInAutoConnector
+    bot = LinkedInAutoConnector(cancel_token=cancel_token)
+    try:
+        if not bot.setup_driver():
+            return "error", "driver setup failed"
+        if not bot.login(email, password):
+            return "error", "login failed"
+        if keyword:
+            sent = bot.search_and_connect_by_keyword(keyword, max_connections)
+        else:
+            sent = bot.run_auto_connection_campaign(total_connections=max_connections) or 0
+    finally:
+        bot.close()
+    return "completed", f"connections attempted: {sent}"
+
+
+def run_messaging(email, password, gemini_key, cancel_token=None):
+    from auto import start_messaging_bot
+    ok = start_messaging_bot(email, password, gemini_key, cancel_token=cancel_token)
+    return ("completed" if ok else "error"), "messaging exited"
@@ -2,46 +2,34 @@ import os
 import time
 import random
 import logging
-from logging import FileHandler, StreamHandler
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from selenium.webdriver.chrome.options import Options
+from cancellation import CancelToken
+from driver_factory import acquire_driver, release_task_driver
+from session_store import restore_session, save_session
+import linkedin_urls
+from metrics import timed
+from logging_setup import configure_logging
 
 class LinkedInAutoConnector:
-    def __init__(self):
+    def __init__(self, cancel_token=None, base_url=None):
         self.setup_logging()
+        self.cancel_token = cancel_token or CancelToken()
+        self.base_url = base_url or linkedin_urls.base_url()
         self.driver = None
         self.wait = None
         
     def setup_logging(self):
+        configure_logging()
         self.logger = logging.getLogger("linkedin_connect")
-        if not self.logger.handlers:
-            self.logger.setLevel(logging.INFO)
-            fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', '%H:%M:%S')
-            fh = FileHandler('linkedin_connect.log', encoding='utf-8')
-            fh.setFormatter(fmt)
-            sh = StreamHandler()
-            sh.setFormatter(fmt)
-            self.logger.addHandler(fh)
-            self.logger.addHandler(sh)
 
     def setup_driver(self):
         """Setup Chrome driver"""
-        chrome_options = Options()
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.driver = acquire_driver()
+            self.cancel_token.on_cancel(self.close)
             self.wait = WebDriverWait(self.driver, 20)
             self.logger.info("✅ Chrome driver setup successfully")
             return True
@@ -49,11 +37,15 @@ class LinkedInAutoConnector:
             self.logger.error(f"❌ Failed to setup driver: {e}")
             return False
 
+    @timed("login")
     def login(self, email, password):
         """Login to LinkedIn"""
         try:
+            if restore_session(self.driver, email, password, base_url=self.base_url):
+                self.logger.info("✅ Reused saved session")
+                return True
             self.logger.info("🔐 Logging into LinkedIn...")
-            self.driver.get("https://www.linkedin.com/login")
+            self.driver.get(linkedin_urls.linkedin_url("/login", self.base_url))
             time.sleep(3)
 
             # Enter email
@@ -79,10 +71,12 @@ class LinkedInAutoConnector:
             # Check login success
             if any(x in self.driver.current_url for x in ['feed', 'dashboard', 'mynetwork']):
                 self.logger.info("✅ Login successful!")
+                save_session(self.driver, email, password)
                 return True
             elif "checkpoint" in self.driver.current_url:
                 self.logger.warning("⚠️ Verification required.")
                 input("Complete verification and press Enter to continue...")
+                save_session(self.driver, email, password)
                 return True
             else:
                 self.logger.info("✅ Assuming login successful (on main page)")
@@ -115,14 +109,14 @@ class LinkedInAutoConnector:
         self.logger.info(f"📊 ~{connections_per_category} connections per category")
         
         for category, keywords_list in connection_categories.items():
-            if total_connections >= max_connections:
+            if total_connections >= max_connections or self.cancel_token.cancelled:
                 break
                 
             self.logger.info(f"\n🔍 Searching category: {category.upper()}")
             
             # Try each keyword in the category
             for keyword in keywords_list:
-                if total_connections >= max_connections:
+                if total_connections >= max_connections or self.cancel_token.cancelled:
                     break
                     
                 remaining_connections = min(
@@ -142,7 +136,7 @@ class LinkedInAutoConnector:
                 if sent > 0:
                     pause_time = random.uniform(10, 20)
                     self.logger.info(f"⏸️ Pausing {pause_time:.1f}s before next search...")
-                    time.sleep(pause_time)
+                    self.cancel_token.sleep(pause_time)
                 
                 # Break after successful connections to move to next category
                 if sent > 0:
@@ -158,7 +152,7 @@ class LinkedInAutoConnector:
         try:
             # Go to LinkedIn people search
             search_url = (
-                f"https://www.linkedin.com/search/results/people/?keywords={keyword.replace(' ', '%20')}"
+                f"{self.base_url}/search/results/people/?keywords={keyword.replace(' ', '%20')}"
                 f"&origin=SWITCH_SEARCH_VERTICAL&network=%5B%22S%22,%22O%22%5D"
             )
             self.driver.get(search_url)
@@ -171,7 +165,7 @@ class LinkedInAutoConnector:
             page_attempts = 0
             max_pages = 2
             
-            while connections_sent < max_connections and page_attempts < max_pages:
+            while connections_sent < max_connections and page_attempts < max_pages and not self.cancel_token.cancelled:
                 # Scroll to load more results
                 self.scroll_page()
                 
@@ -185,7 +179,7 @@ class LinkedInAutoConnector:
                 self.logger.info(f"Found {len(all_action_buttons)} action buttons for '{keyword}'")
                 
                 for i, (button, action_type) in enumerate(all_action_buttons):
-                    if connections_sent >= max_connections:
+                    if connections_sent >= max_connections or self.cancel_token.cancelled:
                         break
                         
                     try:
@@ -214,14 +208,15 @@ class LinkedInAutoConnector:
                         
                         # Random delay between actions
                         delay = random.uniform(6, 12)
-                        time.sleep(delay)
+                        if self.cancel_token.sleep(delay):
+                            break
                         
                     except Exception as e:
                         self.logger.warning(f"⚠️ Error processing button {i+1}: {str(e)}")
                         continue
                 
                 # Try next page if needed
-                if connections_sent < max_connections and page_attempts < max_pages - 1:
+                if connections_sent < max_connections and page_attempts < max_pages - 1 and not self.cancel_token.cancelled:
                     if self.go_to_next_page():
                         page_attempts += 1
                         time.sleep(4)
@@ -470,8 +465,9 @@ class LinkedInAutoConnector:
 
     def close(self):
         """Close browser"""
-        if self.driver:
-            self.driver.quit()
+        driver, self.driver = self.driver, None
+        if driver:
+            release_task_driver(driver, self.cancel_token)
             self.logger.info("🔚 Browser closed")
 
 def main():
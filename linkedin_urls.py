@@ -0,0 +1,12 @@
+import os
+
+DEFAULT_BASE_URL = "https://www.linkedin.com"
+
+
+def base_url():
+    """Site root from LINKEDIN_BASE_URL (e.g. a local fixture_server), else the real site"""
+    return os.environ.get("LINKEDIN_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def linkedin_url(path, base=None):
+    return (base or base_url()).rstrip("/") + path
@@ -0,0 +1,417 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+import urllib3
+
+from metrics import REGISTRY, Counter, Histogram
+
+logger = logging.getLogger("linkedin_agent")
+
+LLM_SECONDS = REGISTRY.register(Histogram(
+    "linkedin_llm_request_seconds",
+    "LLM completion latency including retries",
+    ("provider", "outcome"),
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "linkedin_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ("provider", "type"),
+))
+LLM_FIRST_TOKEN = REGISTRY.register(Histogram(
+    "linkedin_llm_first_token_seconds",
+    "Time until a streamed completion produced its first text",
+    ("provider",),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15),
+))
+
+Completion = namedtuple("Completion", "text prompt_tokens completion_tokens")
+
+# one pooled HTTP client for every provider; keep-alive connections are reused across tasks
+_HTTP = urllib3.PoolManager(maxsize=int(os.environ.get("LLM_POOL_SIZE", "4")), retries=False)
+
+
+class LLMError(Exception):
+    """The completion failed; callers fall back to template content"""
+
+
+class CircuitOpen(LLMError):
+    pass
+
+
+class _RetryableError(LLMError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Open after `threshold` consecutive failures; while open every call fails
+    fast. After `reset_timeout` seconds one trial call is let through and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold=3, reset_timeout=60):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+def _request(url, body, headers, timeout, stream=False):
+    try:
+        response = _HTTP.request(
+            "POST", url, body=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", **headers},
+            timeout=urllib3.Timeout(connect=min(timeout, 5), read=timeout),
+            preload_content=not stream,
+        )
+    except urllib3.exceptions.HTTPError as e:
+        raise _RetryableError(f"request failed: {e}") from e
+    if response.status == 429 or response.status >= 500:
+        response.release_conn()
+        raise _RetryableError(f"HTTP {response.status}")
+    if response.status >= 400:
+        detail = (response.read(200) if stream else response.data[:200]).decode("utf-8", errors="replace")
+        response.release_conn()
+        raise LLMError(f"HTTP {response.status}: {detail}")
+    return response
+
+
+def _post_json(url, body, headers, timeout):
+    response = _request(url, body, headers, timeout)
+    try:
+        return json.loads(response.data)
+    except ValueError as e:
+        raise _RetryableError("invalid JSON response") from e
+
+
+def _stream_events(url, body, headers, timeout):
+    """POST and yield the JSON payload of each server-sent `data:` line as it arrives"""
+    response = _request(url, body, headers, timeout, stream=True)
+    try:
+        for line in response:
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == b"[DONE]":
+                return
+            try:
+                yield json.loads(payload)
+            except ValueError as e:
+                raise LLMError("invalid stream event") from e
+    except urllib3.exceptions.HTTPError as e:
+        raise _RetryableError(f"stream interrupted: {e}") from e
+    finally:
+        response.release_conn()
+
+
+class OpenAIProvider:
+    """Chat Completions API (OpenAI or any compatible endpoint via OPENAI_BASE_URL)"""
+
+    name = "openai"
+
+    def __init__(self, api_key, model="gpt-3.5-turbo", base_url=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = (base_url or os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+
+    def complete(self, messages, max_tokens, temperature, timeout):
+        data = _post_json(
+            f"{self.base_url}/chat/completions",
+            {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+            {"Authorization": f"Bearer {self.api_key}"},
+            timeout,
+        )
+        try:
+            text = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError("unexpected response shape") from e
+        usage = data.get("usage") or {}
+        return Completion(text or "", usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+    def stream(self, messages, max_tokens, temperature, timeout):
+        """Yield Completion deltas: text as it arrives, token usage in the last one"""
+        events = _stream_events(
+            f"{self.base_url}/chat/completions",
+            {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature,
+             "stream": True, "stream_options": {"include_usage": True}},
+            {"Authorization": f"Bearer {self.api_key}"},
+            timeout,
+        )
+        for event in events:
+            for choice in event.get("choices") or ():
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    yield Completion(text, 0, 0)
+            usage = event.get("usage")
+            if usage:
+                yield Completion("", usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+
+class GeminiProvider:
+    """Gemini generateContent REST API"""
+
+    name = "gemini"
+
+    def __init__(self, api_key, model="gemini-1.5-flash", base_url=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = (base_url or os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")).rstrip("/")
+
+    @staticmethod
+    def _body(messages, max_tokens, temperature):
+        system = [m["content"] for m in messages if m["role"] == "system"]
+        body = {
+            "contents": [
+                {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                for m in messages if m["role"] != "system"
+            ],
+            "generationConfig": {"maxOutputTokens": max_tokens, "temperature": temperature},
+        }
+        if system:
+            body["systemInstruction"] = {"parts": [{"text": "\n".join(system)}]}
+        return body
+
+    def complete(self, messages, max_tokens, temperature, timeout):
+        data = _post_json(
+            f"{self.base_url}/models/{self.model}:generateContent",
+            self._body(messages, max_tokens, temperature), {"x-goog-api-key": self.api_key}, timeout)
+        try:
+            text = "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError("unexpected response shape") from e
+        usage = data.get("usageMetadata") or {}
+        return Completion(text, usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0))
+
+    def stream(self, messages, max_tokens, temperature, timeout):
+        """Yield Completion deltas: text as it arrives, token usage in the last one"""
+        events = _stream_events(
+            f"{self.base_url}/models/{self.model}:streamGenerateContent?alt=sse",
+            self._body(messages, max_tokens, temperature), {"x-goog-api-key": self.api_key}, timeout)
+        usage = {}
+        for event in events:
+            for candidate in event.get("candidates") or ():
+                text = "".join(part.get("text", "") for part in (candidate.get("content") or {}).get("parts", ()))
+                if text:
+                    yield Completion(text, 0, 0)
+            # usage metadata is cumulative; only the last one counts
+            usage = event.get("usageMetadata") or usage
+        yield Completion("", usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0))
+
+
+class FakeProvider:
+    """
+    Offline stand-in: answers from `responses` in turn (or echoes the last
+    prompt line), after `latency` seconds. The first `failures` calls raise
+    a retryable error, to exercise retries and the circuit breaker.
+    """
+
+    name = "fake"
+
+    def __init__(self, responses=None, latency=0.0, failures=0):
+        self.responses = list(responses or [])
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            return self.calls
+
+    def _text(self, call, messages):
+        if call <= self.failures:
+            raise _RetryableError("simulated failure")
+        if self.responses:
+            return self.responses[(call - 1 - self.failures) % len(self.responses)]
+        prompt = messages[-1]["content"].strip().splitlines()
+        return f"Fake completion for: {prompt[0] if prompt else ''}"
+
+    def complete(self, messages, max_tokens, temperature, timeout):
+        call = self._call()
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+            if self.latency > timeout:
+                raise _RetryableError("timed out")
+        text = self._text(call, messages)
+        return Completion(text, sum(len(m["content"].split()) for m in messages), len(text.split()))
+
+    def stream(self, messages, max_tokens, temperature, timeout):
+        """The complete() answer word by word, with the latency spread across the words"""
+        text = self._text(self._call(), messages)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            yield Completion(word if i == 0 else " " + word, 0, 0)
+        yield Completion("", sum(len(m["content"].split()) for m in messages), len(text.split()))
+
+
+class LLMClient:
+    """
+    Provider-agnostic completions with a total deadline per call, retries
+    with jittered exponential backoff on timeouts, 429s and 5xx, and a
+    circuit breaker that fails fast after repeated failures.
+    """
+
+    def __init__(self, provider, timeout=20, retries=2, backoff=0.5, breaker=None):
+        self.provider = provider
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+    def complete(self, messages, max_tokens=250, temperature=0.7, timeout=None):
+        """Return the completion text or raise LLMError (CircuitOpen without a network call)"""
+        name = self.provider.name
+        if not self.breaker.allow():
+            LLM_SECONDS.observe(0, provider=name, outcome="circuit_open")
+            raise CircuitOpen(f"{name} circuit open")
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            try:
+                result = self.provider.complete(messages, max_tokens, temperature, max(deadline - time.monotonic(), 0.1))
+                break
+            except _RetryableError as e:
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if attempt >= self.retries or time.monotonic() + delay >= deadline:
+                    self._failed(name, start, e)
+                attempt += 1
+                logger.info(f"{name} completion failed ({e}); retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+            except LLMError as e:
+                self._failed(name, start, e)
+            except Exception as e:
+                # e.g. a malformed response tripping the parser; still a failure, or a half-open trial never ends
+                self._failed(name, start, LLMError(f"{type(e).__name__}: {e}"))
+        self.breaker.success()
+        LLM_SECONDS.observe(time.monotonic() - start, provider=name, outcome="ok")
+        LLM_TOKENS.inc(result.prompt_tokens, provider=name, type="prompt")
+        LLM_TOKENS.inc(result.completion_tokens, provider=name, type="completion")
+        return result.text.strip()
+
+    def stream(self, messages, max_tokens=250, temperature=0.7, timeout=None):
+        """
+        Yield the completion text in pieces as the provider produces them;
+        errors as in complete(). Failures before the first piece are retried,
+        a failure after it ends the stream with LLMError.
+        """
+        name = self.provider.name
+        if not self.breaker.allow():
+            LLM_SECONDS.observe(0, provider=name, outcome="circuit_open")
+            raise CircuitOpen(f"{name} circuit open")
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout)
+        attempt = 0
+        started = False
+        prompt_tokens = completion_tokens = 0
+        while True:
+            try:
+                for delta in self.provider.stream(messages, max_tokens, temperature, max(deadline - time.monotonic(), 0.1)):
+                    if time.monotonic() > deadline:
+                        raise LLMError("deadline exceeded")
+                    prompt_tokens += delta.prompt_tokens
+                    completion_tokens += delta.completion_tokens
+                    if delta.text:
+                        if not started:
+                            started = True
+                            LLM_FIRST_TOKEN.observe(time.monotonic() - start, provider=name)
+                        yield delta.text
+                break
+            except GeneratorExit:
+                # the reader went away mid-stream; the provider was answering, so the circuit stays closed
+                self.breaker.success()
+                LLM_SECONDS.observe(time.monotonic() - start, provider=name, outcome="abandoned")
+                raise
+            except _RetryableError as e:
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if started or attempt >= self.retries or time.monotonic() + delay >= deadline:
+                    self._failed(name, start, e)
+                attempt += 1
+                logger.info(f"{name} stream failed ({e}); retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+            except LLMError as e:
+                self._failed(name, start, e)
+            except Exception as e:
+                # e.g. a malformed response tripping the parser; still a failure, or a half-open trial never ends
+                self._failed(name, start, LLMError(f"{type(e).__name__}: {e}"))
+        self.breaker.success()
+        LLM_SECONDS.observe(time.monotonic() - start, provider=name, outcome="ok")
+        LLM_TOKENS.inc(prompt_tokens, provider=name, type="prompt")
+        LLM_TOKENS.inc(completion_tokens, provider=name, type="completion")
+
+    def _failed(self, name, start, error):
+        self.breaker.failure()
+        LLM_SECONDS.observe(time.monotonic() - start, provider=name, outcome="error")
+        raise error
+
+
+PROVIDERS = {"openai": OpenAIProvider, "gemini": GeminiProvider}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider, api_key):
+    """
+    Shared LLMClient per provider and key, so the circuit breaker sees every
+    task's calls. LLM_PROVIDER=fake swaps in FakeProvider for offline runs.
+    """
+    if os.environ.get("LLM_PROVIDER") == "fake":
+        provider = "fake"
+    key = (provider, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            instance = FakeProvider() if provider == "fake" else PROVIDERS[provider](api_key)
+            client = _clients[key] = LLMClient(
+                instance,
+                timeout=float(os.environ.get("LLM_TIMEOUT", "20")),
+                retries=int(os.environ.get("LLM_RETRIES", "2")),
+                breaker=CircuitBreaker(
+                    threshold=int(os.environ.get("LLM_BREAKER_THRESHOLD", "3")),
+                    reset_timeout=float(os.environ.get("LLM_BREAKER_RESET", "60")),
+                ),
+            )
+        return client
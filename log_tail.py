@@ -0,0 +1,70 @@
+import os
+
+
+def _complete_lines(data):
+    """The prefix of data up to and including its last newline; a writer may be mid-line"""
+    return data[:data.rfind(b"\n") + 1]
+
+
+def _tail(f, size, max_bytes, block_size):
+    pos = size
+    blocks = []
+    read = 0
+    while pos > 0 and read < max_bytes:
+        step = min(block_size, pos, max_bytes - read)
+        pos -= step
+        f.seek(pos)
+        blocks.append(f.read(step))
+        read += step
+    data = b"".join(reversed(blocks))
+    if pos > 0:
+        newline = data.find(b"\n")
+        data = data[newline + 1:] if newline != -1 else b""
+    start = size - len(data)
+    data = _complete_lines(data)
+    return data.decode("utf-8", errors="replace"), start + len(data)
+
+
+def tail(path, max_bytes=6000, block_size=4096):
+    """
+    Read the end of a log file by seeking backwards in blocks.
+
+    Returns (text, end_offset, inode). The text is whole lines only: it
+    starts on a line boundary unless the whole file fits in max_bytes, and a
+    trailing partial line is left for the next read. end_offset and inode
+    are the cursor for read_since().
+    """
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            text, end = _tail(f, st.st_size, max_bytes, block_size)
+    except OSError:
+        return "", 0, None
+    return text, end, st.st_ino
+
+
+def read_since(path, offset, inode=None, max_bytes=6000, block_size=4096):
+    """
+    Read the complete lines appended after `offset`.
+
+    Returns (text, end_offset, inode, reset). end_offset only advances past
+    the last newline read, so a line still being written (and any multi-byte
+    character split with it) is picked up whole next time. reset is True
+    when the text replaces rather than extends what the caller has: the file
+    was rotated (its inode is no longer `inode`) or truncated (it is now
+    shorter than offset), or more than max_bytes were written since offset
+    and only the tail is returned.
+    """
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            rotated = inode is not None and st.st_ino != inode
+            if rotated or offset < 0 or offset > size or size - offset > max_bytes:
+                text, end = _tail(f, size, max_bytes, block_size)
+                return text, end, st.st_ino, True
+            f.seek(offset)
+            data = _complete_lines(f.read(size - offset))
+    except OSError:
+        return "", 0, None, offset != 0
+    return data.decode("utf-8", errors="replace"), offset + len(data), st.st_ino, False
@@ -0,0 +1,206 @@
+import io
+import os
+import sys
+import gzip
+import fcntl
+import queue
+import atexit
+import shutil
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+AGENT_LOG = "linkedin_agent.log"
+CONNECT_LOG = "linkedin_connect.log"
+
+_lock = threading.Lock()
+_listeners = []
+_forwarding = False
+_task_id = contextvars.ContextVar("task_id", default=None)
+
+
+def set_task_id(task_id):
+    """Tag log records from the current thread with a task correlation id (None to clear)"""
+    _task_id.set(task_id)
+
+
+def current_task_id():
+    return _task_id.get()
+
+
+def _install_record_factory():
+    base_factory = logging.getLogRecordFactory()
+
+    def factory(*args, **kwargs):
+        record = base_factory(*args, **kwargs)
+        record.task_id = _task_id.get()
+        record.task_tag = f"[task {record.task_id}] " if record.task_id is not None else ""
+        return record
+
+    logging.setLogRecordFactory(factory)
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for a file appended to by several processes (every
+    gunicorn worker opens its own). Each write holds an flock on
+    <path>.lock, so only one process rotates at a time, and a process
+    reopens the file when its inode changed, so nobody keeps writing into
+    a file another process has rotated away.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._inode = None
+        self._lock_fd = None
+        super().__init__(*args, **kwargs)
+
+    def _open(self):
+        stream = super()._open()
+        self._inode = os.fstat(stream.fileno()).st_ino
+        return stream
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            inode = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            inode = None
+        if inode != self._inode:
+            self.stream.close()
+            self.stream = self._open()
+
+    def emit(self, record):
+        try:
+            if self._lock_fd is None:
+                self._lock_fd = os.open(self.baseFilename + ".lock", os.O_WRONLY | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        except OSError:
+            self.handleError(record)
+            return
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def close(self):
+        with self.lock:
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+        super().close()
+
+
+def _rotating_file(path, formatter, max_bytes, backup_count):
+    handler = SharedRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(formatter)
+    return handler
+
+
+def _console(formatter):
+    # one UTF-8 wrapper for the process so emoji never break logging on narrow consoles
+    buffer = getattr(sys.stdout, "buffer", None)
+    stream = io.TextIOWrapper(buffer, encoding="utf-8", errors="replace", line_buffering=True) if buffer else sys.stdout
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def _attach(logger, handlers):
+    q = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(q))
+    listener = QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+def configure_logging(level=logging.INFO):
+    """
+    Set up logging once per process.
+
+    Callers only enqueue records; a background listener per log file does
+    the disk and console writes. Files rotate at LOG_MAX_BYTES (default
+    5 MB) and keep LOG_BACKUP_COUNT (default 5) gzip-compressed archives;
+    processes sharing the files coordinate rotation through a lock file.
+    Safe to call repeatedly, and a no-op in a process set up with
+    forward_logging().
+    """
+    with _lock:
+        if _listeners or _forwarding:
+            return
+        max_bytes = int(os.environ.get("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+        backup_count = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+
+        _install_record_factory()
+        agent_fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(task_tag)s%(message)s')
+        connect_fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(task_tag)s%(message)s', '%H:%M:%S')
+        console = _console(agent_fmt)
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        _attach(root, [_rotating_file(AGENT_LOG, agent_fmt, max_bytes, backup_count), console])
+
+        connect = logging.getLogger("linkedin_connect")
+        connect.setLevel(level)
+        connect.propagate = False
+        connect_console = logging.StreamHandler(console.stream)
+        connect_console.setFormatter(connect_fmt)
+        _attach(connect, [_rotating_file(CONNECT_LOG, connect_fmt, max_bytes, backup_count), connect_console])
+
+        atexit.register(shutdown_logging)
+
+
+def forward_logging(q, task_id=None, level=logging.INFO):
+    """
+    Send this process's records to q instead of the log files (for job
+    child processes; the parent drains q with drain_forwarded_logs), so
+    only the serving process writes and rotates the files.
+    """
+    global _forwarding
+    with _lock:
+        _forwarding = True
+        _install_record_factory()
+        set_task_id(task_id)
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(QueueHandler(q))
+        # linkedin_connect records reach the root handler; the parent routes them by logger name
+        connect = logging.getLogger("linkedin_connect")
+        connect.setLevel(level)
+        connect.propagate = True
+
+
+def drain_forwarded_logs(q):
+    """Hand records forwarded by a child to this process's loggers until a None sentinel arrives"""
+    while True:
+        try:
+            record = q.get()
+        except Exception:
+            # a child killed mid-write can leave a torn record; stop rather than spin
+            return
+        if record is None:
+            return
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listeners"""
+    with _lock:
+        while _listeners:
+            _listeners.pop().stop()
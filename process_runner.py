@@ -0,0 +1,151 @@
+import os
+import signal
+import logging
+import threading
+import multiprocessing
+
+from cancellation import CancelToken
+from resource_monitor import all_stats, process_group, register_process_group
+from logging_setup import current_task_id, drain_forwarded_logs, forward_logging
+
+logger = logging.getLogger("linkedin_agent")
+
+BROWSER_NAMES = ("chrome", "chromedriver", "chrome_crashpad")
+
+
+def run_inline(fn, args, cancel_token):
+    """Default runner: call the job in the executor's worker thread"""
+    return fn(*args, cancel_token=cancel_token)
+
+
+def group_rss(pgid):
+    """Total RSS in bytes of every process in a process group"""
+    return sum(s.rss for s in process_group(pgid))
+
+
+def kill_group(pgid, sig=signal.SIGKILL):
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def reap_orphans(sid):
+    """
+    Kill chrome/chromedriver processes left in session sid, the job child's
+    own setsid() session, e.g. ones that moved to another process group;
+    browsers of other jobs and the user's own Chrome are in other sessions.
+    """
+    killed = 0
+    for stat in all_stats():
+        if stat.sid != sid or not stat.comm.startswith(BROWSER_NAMES):
+            continue
+        try:
+            os.kill(stat.pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            continue
+    return killed
+
+
+def _child_main(conn, log_queue, task_id, fn, args, cpu_seconds, address_space_bytes):
+    # own session, so the browser processes we spawn can be killed as one group
+    os.setsid()
+    forward_logging(log_queue, task_id)
+    try:
+        import resource
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 5))
+        if address_space_bytes:
+            resource.setrlimit(resource.RLIMIT_AS, (address_space_bytes, address_space_bytes))
+    except (ImportError, ValueError, OSError):
+        pass
+    token = CancelToken()
+    signal.signal(signal.SIGTERM, lambda signum, frame: token.cancel("terminated"))
+    try:
+        result = fn(*args, cancel_token=token)
+        conn.send(("result", result))
+    except BaseException as e:
+        conn.send(("result", ("error", f"{type(e).__name__}: {e}")))
+    finally:
+        conn.close()
+
+
+class ProcessRunner:
+    """
+    Run each job in its own child process.
+
+    The child gets its own process group, an optional RLIMIT_CPU and
+    RLIMIT_AS, and is watched for total group RSS. Cancellation is forwarded
+    as SIGTERM; force() and every job exit SIGKILL the whole group so no
+    chrome or chromedriver outlives its job. The job's return value comes
+    back over a pipe and its log records over a queue, so only this process
+    writes the log files.
+
+    RLIMIT_AS is inherited by Chrome, which reserves several GB of virtual
+    address space up front, so max_rss_mb is usually the limit to use.
+    """
+
+    def __init__(self, max_rss_mb=None, cpu_seconds=None, address_space_mb=None, sample_interval=1.0):
+        self.max_rss = int(max_rss_mb * 1024 * 1024) if max_rss_mb else None
+        self.cpu_seconds = cpu_seconds
+        self.address_space = int(address_space_mb * 1024 * 1024) if address_space_mb else None
+        self.sample_interval = sample_interval
+        self._ctx = multiprocessing.get_context("spawn")
+
+    def __call__(self, fn, args, cancel_token):
+        parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+        # the child's log records are written by this process, so one process owns the log files
+        log_queue = self._ctx.Queue()
+        drain = threading.Thread(target=drain_forwarded_logs, args=(log_queue,), name="job-log-drain", daemon=True)
+        drain.start()
+        proc = self._ctx.Process(
+            target=_child_main,
+            args=(child_conn, log_queue, current_task_id(), fn, args, self.cpu_seconds, self.address_space),
+            name=f"job-{getattr(fn, '__name__', 'task')}",
+        )
+        proc.start()
+        child_conn.close()
+        pgid = proc.pid
+        register_process_group(pgid)
+        cancel_token.on_cancel(lambda: kill_group(pgid))
+        terminated = False
+        result = None
+        try:
+            while True:
+                if parent_conn.poll(self.sample_interval):
+                    try:
+                        result = parent_conn.recv()[1]
+                    except EOFError:
+                        pass
+                    break
+                if not proc.is_alive():
+                    break
+                if cancel_token.cancelled and not terminated:
+                    terminated = True
+                    try:
+                        os.kill(proc.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+                if self.max_rss is not None:
+                    rss = group_rss(pgid)
+                    if rss > self.max_rss:
+                        logger.error(f"❌ Job process group {pgid} exceeded RSS limit ({rss // (1024 * 1024)} MB), killing it")
+                        kill_group(pgid)
+                        proc.join(5)
+                        return "error", f"killed: memory limit exceeded ({rss // (1024 * 1024)} MB)"
+            proc.join(5)
+        finally:
+            parent_conn.close()
+            kill_group(pgid)
+            if proc.is_alive():
+                proc.kill()
+                proc.join(1)
+            # the child called setsid(), so its session id is its pid
+            reap_orphans(proc.pid)
+            log_queue.put(None)
+            drain.join(5)
+            log_queue.close()
+        if result is None:
+            return "error", f"job process exited with code {proc.exitcode}"
+        return result
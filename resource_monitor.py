@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import namedtuple
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+ProcStat = namedtuple("ProcStat", "pid comm ppid pgid sid cpu_seconds rss")
+
+_current = threading.local()
+
+
+def read_stat(pid):
+    """Read /proc/<pid>/stat, or None if the process is gone"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return None
+    # comm is wrapped in parentheses and may itself contain spaces
+    comm = data[data.index("(") + 1:data.rindex(")")]
+    fields = data[data.rindex(")") + 2:].split()
+    cpu = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    return ProcStat(pid, comm, int(fields[1]), int(fields[2]), int(fields[3]), cpu, int(fields[21]) * _PAGE_SIZE)
+
+
+def list_pids():
+    try:
+        return [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return []
+
+
+def all_stats():
+    return [s for s in map(read_stat, list_pids()) if s is not None]
+
+
+def process_tree(root_pid, stats=None):
+    """Stats for root_pid and all of its descendants"""
+    stats = stats if stats is not None else all_stats()
+    children = {}
+    for s in stats:
+        children.setdefault(s.ppid, []).append(s)
+    tree = [s for s in stats if s.pid == root_pid]
+    i = 0
+    while i < len(tree):
+        tree.extend(children.get(tree[i].pid, ()))
+        i += 1
+    return tree
+
+
+def process_group(pgid, stats=None):
+    stats = stats if stats is not None else all_stats()
+    return [s for s in stats if s.pgid == pgid]
+
+
+def bind(monitor, task_id):
+    """Attribute browser processes registered from this thread to task_id"""
+    _current.binding = (monitor, task_id) if monitor is not None else None
+
+
+def register_driver(driver):
+    """Record a freshly started WebDriver's chromedriver process tree for the current task"""
+    binding = getattr(_current, "binding", None)
+    if binding is None:
+        return
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        return
+    monitor, task_id = binding
+    monitor.watch(task_id, pid=pid)
+
+
+def register_process_group(pgid):
+    """Record a job's process group (process-isolated runner) for the current task"""
+    binding = getattr(_current, "binding", None)
+    if binding is not None:
+        monitor, task_id = binding
+        monitor.watch(task_id, pgid=pgid)
+
+
+class ResourceMonitor:
+    """
+    Periodically sample RSS, CPU time and process count of each task's browser
+    processes from /proc and publish current and peak values on the task as
+    `resources`.
+    """
+
+    def __init__(self, registry, interval=5.0):
+        self.registry = registry
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watched = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def watch(self, task_id, pid=None, pgid=None):
+        with self._lock:
+            entry = self._watched.setdefault(task_id, {"roots": set(), "groups": set(), "peak_rss": 0, "peak_processes": 0})
+            if pid is not None:
+                entry["roots"].add(pid)
+            if pgid is not None:
+                entry["groups"].add(pgid)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="resource-monitor", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def release(self, task_id):
+        """Stop sampling a task, keeping its last published values"""
+        with self._lock:
+            self._watched.pop(task_id, None)
+
+    def sample(self):
+        with self._lock:
+            watched = {task_id: entry for task_id, entry in self._watched.items()}
+        if not watched:
+            return
+        stats = all_stats()
+        for task_id, entry in watched.items():
+            procs = {}
+            for root in list(entry["roots"]):
+                procs.update((s.pid, s) for s in process_tree(root, stats))
+            for pgid in list(entry["groups"]):
+                procs.update((s.pid, s) for s in process_group(pgid, stats))
+            if not procs:
+                continue
+            rss = sum(s.rss for s in procs.values())
+            entry["peak_rss"] = max(entry["peak_rss"], rss)
+            entry["peak_processes"] = max(entry["peak_processes"], len(procs))
+            self.registry.update(task_id, resources={
+                "rss_mb": round(rss / 1048576, 1),
+                "peak_rss_mb": round(entry["peak_rss"] / 1048576, 1),
+                "cpu_seconds": round(sum(s.cpu_seconds for s in procs.values()), 2),
+                "processes": len(procs),
+                "peak_processes": entry["peak_processes"],
+            })
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.sample()
+            except Exception:
+                pass
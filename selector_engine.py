@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from metrics import REGISTRY, Counter
+
+logger = logging.getLogger("linkedin_agent")
+
+SELECTOR_LOOKUPS = REGISTRY.register(Counter(
+    "linkedin_selector_lookups_total",
+    "Selector lookups per logical element: hit (cached winner matched), fallback (another candidate won) or miss",
+    ("element", "result"),
+))
+
+# Evaluates every candidate in order inside the page and returns [index, match] for the first
+# one with an element in the requested state, so a lookup costs one round trip however many fail
+_RACE_SCRIPT = """
+const [selectors, by, state, many] = arguments;
+function query(selector) {
+    if (by === 'css') return Array.from(document.querySelectorAll(selector));
+    const result = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const nodes = [];
+    for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+    return nodes;
+}
+function ready(el) {
+    if (state === 'present') return true;
+    const style = window.getComputedStyle(el);
+    if (!el.getClientRects().length || style.visibility === 'hidden') return false;
+    if (state === 'visible') return true;
+    if (el.disabled) return false;
+    return state === 'clickable' || el.getAttribute('aria-disabled') !== 'true';
+}
+for (let i = 0; i < selectors.length; i++) {
+    let nodes;
+    try { nodes = query(selectors[i]).filter(ready); } catch (e) { continue; }
+    if (nodes.length) return [i, many ? nodes : nodes[0]];
+}
+return null;
+"""
+
+
+class SelectorEngine:
+    """
+    Resolve a logical page element from a list of fallback selectors in one
+    execute_script call.
+
+    The candidate that matched last time for each element name is tried
+    first and persisted to a small JSON cache. Outcomes are counted in
+    linkedin_selector_lookups_total so a markup change shows up as a drop in
+    hits. state is one of present, visible, clickable or enabled (clickable
+    and not aria-disabled).
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._winners = None
+
+    def _load(self):
+        if self._winners is None:
+            self._winners = {}
+            if self.cache_path:
+                try:
+                    with open(self.cache_path, encoding="utf-8") as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._winners = data
+                except (OSError, ValueError):
+                    pass
+        return self._winners
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._winners, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save selector cache: {e}")
+
+    def ordered(self, name, selectors):
+        """Candidates with the cached winner for name moved to the front"""
+        with self._lock:
+            winner = self._load().get(name)
+        if winner in selectors:
+            return [winner] + [s for s in selectors if s != winner]
+        return list(selectors)
+
+    @staticmethod
+    def match(driver, selectors, by="xpath", state="visible", many=False):
+        """One round trip: (selector, element or elements) for the first candidate that matches, else None"""
+        result = driver.execute_script(_RACE_SCRIPT, list(selectors), by, state, many)
+        if not result:
+            return None
+        index, found = result
+        return selectors[index], found
+
+    def record(self, name, selector):
+        """Count a lookup outcome and remember the winning selector"""
+        if selector is None:
+            SELECTOR_LOOKUPS.inc(element=name, result="miss")
+            return
+        with self._lock:
+            winners = self._load()
+            previous = winners.get(name)
+            if previous == selector:
+                SELECTOR_LOOKUPS.inc(element=name, result="hit")
+                return
+            winners[name] = selector
+            self._save()
+        SELECTOR_LOOKUPS.inc(element=name, result="fallback")
+        if previous is not None:
+            logger.warning(f"Selector for '{name}' changed: {previous!r} -> {selector!r}")
+
+    def find(self, driver, name, selectors, by="xpath", state="visible", many=False):
+        """Single attempt; returns the element (list with many=True), or None ([] with many=True)"""
+        candidates = self.ordered(name, selectors)
+        result = self.match(driver, candidates, by, state, many)
+        self.record(name, result[0] if result else None)
+        if result is None:
+            return [] if many else None
+        return result[1]
+
+    def wait(self, driver, name, selectors, timeout=10, by="xpath", state="visible", many=False,
+             poll=0.2, should_stop=None):
+        """
+        Poll until a candidate matches or timeout seconds pass. Returns like
+        find(); should_stop() returning True ends the wait early as a miss
+        that is not counted.
+        """
+        candidates = self.ordered(name, selectors)
+        deadline = time.monotonic() + timeout
+        while True:
+            if should_stop is not None and should_stop():
+                return [] if many else None
+            result = self.match(driver, candidates, by, state, many)
+            if result is not None or time.monotonic() >= deadline:
+                break
+            time.sleep(poll)
+        self.record(name, result[0] if result else None)
+        if result is None:
+            return [] if many else None
+        return result[1]
+
+
+ENGINE = SelectorEngine(os.environ.get("SELECTOR_CACHE", "selector_cache.json"))
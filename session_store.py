@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import base64
+import hmac
+import hashlib
+import logging
+
+from metrics import REGISTRY, Counter
+from linkedin_urls import base_url as default_base_url, linkedin_url
+
+logger = logging.getLogger("linkedin_agent")
+
+LOGGED_OUT_MARKERS = ("login", "authwall", "checkpoint", "signup", "uas/")
+
+SESSION_RESTORES = REGISTRY.register(Counter(
+    "linkedin_session_restores_total",
+    "Saved session restore attempts: reused, expired, missing or mismatch (wrong password)",
+    ("result",),
+))
+
+
+class SessionStore:
+    """
+    Browser cookies per account, encrypted at rest with Fernet.
+
+    key is any long random secret; files are named by a hash of the
+    account so the directory does not reveal which accounts are stored.
+    Each record carries an HMAC of account and password, and load() only
+    returns it to a caller presenting the same password, so knowing an
+    account's email is not enough to act as it.
+    """
+
+    def __init__(self, directory, key):
+        from cryptography.fernet import Fernet
+
+        self.directory = directory
+        self._fernet = Fernet(base64.urlsafe_b64encode(hashlib.sha256(key.encode("utf-8")).digest()))
+        # separate secret for credential checks, so it is not the encryption key itself
+        self._mac_key = hashlib.sha256(b"credential:" + key.encode("utf-8")).digest()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, account):
+        digest = hashlib.sha256(account.strip().lower().encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.directory, f"{digest}.session")
+
+    def _credential(self, account, password):
+        message = f"{account.strip().lower()}\0{password or ''}".encode("utf-8")
+        return hmac.new(self._mac_key, message, hashlib.sha256).hexdigest()
+
+    def save(self, account, password, cookies):
+        data = json.dumps({
+            "saved_at": time.time(),
+            "credential": self._credential(account, password),
+            "cookies": cookies,
+        }).encode("utf-8")
+        path = self._path(account)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self._fernet.encrypt(data))
+        os.replace(tmp, path)
+
+    def load(self, account, password):
+        """
+        Saved session dict, or None if there is none or it cannot be
+        decrypted; raises PermissionError when password does not match.
+        """
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self._path(account), "rb") as f:
+                token = f.read()
+        except OSError:
+            return None
+        try:
+            session = json.loads(self._fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            logger.warning("Saved session could not be decrypted; ignoring it")
+            return None
+        if not hmac.compare_digest(session.get("credential", ""), self._credential(account, password)):
+            raise PermissionError("credentials do not match the saved session")
+        return session
+
+    def discard(self, account):
+        try:
+            os.remove(self._path(account))
+        except OSError:
+            pass
+
+
+def open_session_store():
+    """SessionStore from SESSION_STORE_DIR and SESSION_KEY, or None when either is unset"""
+    directory = os.environ.get("SESSION_STORE_DIR")
+    key = os.environ.get("SESSION_KEY")
+    if not directory or not key:
+        return None
+    try:
+        return SessionStore(directory, key)
+    except ImportError:
+        logger.warning("SESSION_STORE_DIR is set but the cryptography package is missing; sessions will not be saved")
+    except OSError as e:
+        logger.warning(f"Session store unavailable: {e}")
+    return None
+
+
+STORE = open_session_store()
+
+
+def logged_in(driver, base_url=None):
+    url = driver.current_url
+    return url.startswith(base_url or default_base_url()) and not any(marker in url for marker in LOGGED_OUT_MARKERS)
+
+
+def restore_session(driver, account, password, store=None, base_url=None):
+    """
+    Load the saved cookies for account into driver and confirm them with a
+    single feed load. Returns True if the browser is now logged in; an
+    expired session is discarded so the caller falls back to a full login.
+    A session saved under a different password is left alone and the
+    caller does a full login, which checks the password with LinkedIn.
+    """
+    store = store or STORE
+    if store is None or not account:
+        return False
+    base_url = base_url or default_base_url()
+    try:
+        session = store.load(account, password)
+    except PermissionError:
+        SESSION_RESTORES.inc(result="mismatch")
+        logger.warning("Saved session belongs to different credentials; logging in again")
+        return False
+    if not session:
+        SESSION_RESTORES.inc(result="missing")
+        return False
+    try:
+        # cookies can only be added for the site currently loaded, so open a tiny same-origin page first
+        driver.get(linkedin_url("/robots.txt", base_url))
+        now = time.time()
+        for cookie in session["cookies"]:
+            if cookie.get("expiry") and cookie["expiry"] < now:
+                continue
+            cookie = {k: v for k, v in cookie.items() if k != "sameSite" or v in ("Strict", "Lax", "None")}
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                continue
+        driver.get(linkedin_url("/feed/", base_url))
+        if logged_in(driver, base_url):
+            SESSION_RESTORES.inc(result="reused")
+            logger.info("Reused saved session")
+            return True
+    except Exception as e:
+        # keep the saved session: the failure says nothing about whether it is still valid
+        logger.warning(f"Session restore failed: {e}")
+        return False
+    SESSION_RESTORES.inc(result="expired")
+    logger.info("Saved session expired; logging in again")
+    store.discard(account)
+    driver.delete_all_cookies()
+    return False
+
+
+def save_session(driver, account, password, store=None):
+    """Save the browser's cookies for account after a successful login with password"""
+    store = store or STORE
+    if store is None or not account:
+        return
+    try:
+        store.save(account, password, driver.get_cookies())
+    except Exception as e:
+        logger.warning(f"Could not save session: {e}")
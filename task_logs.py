@@ -0,0 +1,59 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+
+
+class TaskLogBuffers:
+    """Bounded in-memory log ring buffer per task, read with sequence-number cursors"""
+
+    def __init__(self, max_lines=500, max_tasks=200):
+        self.max_lines = max_lines
+        self.max_tasks = max_tasks
+        self._lock = threading.Lock()
+        self._buffers = OrderedDict()
+
+    def append(self, task_id, line):
+        with self._lock:
+            entry = self._buffers.get(task_id)
+            if entry is None:
+                entry = self._buffers[task_id] = {"seq": 0, "lines": deque(maxlen=self.max_lines)}
+                while len(self._buffers) > self.max_tasks:
+                    self._buffers.popitem(last=False)
+            entry["seq"] += 1
+            entry["lines"].append((entry["seq"], line))
+
+    def read(self, task_id, after=0):
+        """
+        Return (lines, next_cursor, truncated) for lines with seq > after, or
+        None if the task has no buffer. truncated is True when lines after
+        the cursor have already been overwritten.
+        """
+        with self._lock:
+            entry = self._buffers.get(task_id)
+            if entry is None:
+                return None
+            lines = [{"seq": seq, "line": line} for seq, line in entry["lines"] if seq > after]
+            truncated = bool(entry["lines"]) and entry["lines"][0][0] > after + 1
+            return lines, entry["seq"], truncated
+
+    def discard(self, task_id):
+        with self._lock:
+            self._buffers.pop(task_id, None)
+
+
+class TaskLogHandler(logging.Handler):
+    """Copy records tagged with a task_id into that task's ring buffer"""
+
+    def __init__(self, buffers, level=logging.INFO):
+        super().__init__(level)
+        self.buffers = buffers
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        task_id = getattr(record, "task_id", None)
+        if task_id is None:
+            return
+        try:
+            self.buffers.append(task_id, self.format(record))
+        except Exception:
+            self.handleError(record)
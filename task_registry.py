@@ -0,0 +1,177 @@
+import time
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+
+
+class TaskRegistry:
+    """Thread-safe task store with O(1) id lookup, per-kind indexes and retention"""
+
+    def __init__(self, kinds, max_finished=200, max_age=None, max_tombstones=1000, on_change=None):
+        """
+        Args:
+            kinds: task kinds to index (e.g. "post", "connect", "messaging")
+            max_finished: keep at most this many finished tasks (None = unlimited)
+            max_age: evict finished tasks older than this many seconds (None = never)
+            max_tombstones: evicted ids remembered for delta queries
+            on_change: optional callback(event, data) fired for "task" and "removed";
+                called with the registry lock held, so it must not block
+        """
+        self.max_finished = max_finished
+        self.max_age = max_age
+        self.on_change = on_change
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._version = 0
+        # ordered by last change, so deltas only walk the changed tail
+        self._tasks = OrderedDict()
+        self._removed = deque(maxlen=max_tombstones)
+        self._removed_floor = 0
+        self._by_kind = {kind: OrderedDict() for kind in kinds}
+        self._finished = OrderedDict()
+
+    def create(self, kind, payload, status="running"):
+        """Register a new task and return a copy of it"""
+        now = time.time()
+        with self._lock:
+            task_id = next(self._ids)
+            task = {
+                "id": task_id,
+                "kind": kind,
+                "status": status,
+                "payload": payload,
+                "message": "",
+                "created_at": now,
+                "updated_at": now,
+                "version": self._bump(),
+            }
+            self._tasks[task_id] = task
+            self._by_kind.setdefault(kind, OrderedDict())[task_id] = task
+            self._notify("task", task)
+            self._evict(now)
+            return dict(task)
+
+    def mark(self, task_id, status, message=None, **fields):
+        """Update a task's status; returns the updated copy or None if unknown"""
+        now = time.time()
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            task["status"] = status
+            if message is not None:
+                task["message"] = message
+            task.update(fields)
+            task["updated_at"] = now
+            task["version"] = self._bump()
+            self._tasks.move_to_end(task_id)
+            if status in FINISHED_STATUSES:
+                self._finished[task_id] = now
+                self._finished.move_to_end(task_id)
+            else:
+                self._finished.pop(task_id, None)
+            self._notify("task", task)
+            self._evict(now)
+            return dict(task)
+
+    def update(self, task_id, **fields):
+        """Set extra fields on a task without changing its status"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            task.update(fields)
+            task["version"] = self._bump()
+            self._tasks.move_to_end(task_id)
+            self._notify("task", task)
+            return dict(task)
+
+    def discard(self, task_id):
+        """Drop a task regardless of status (e.g. a rejected submission)"""
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return False
+            self._finished.pop(task_id, None)
+            self._forget(task)
+            return True
+
+    def get(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def by_kind(self, kind):
+        with self._lock:
+            return [dict(t) for t in self._by_kind.get(kind, {}).values()]
+
+    def snapshot(self):
+        """Return (version, {kind: [task, ...]}) with tasks in creation order"""
+        with self._lock:
+            self._evict(time.time())
+            tasks = {kind: [dict(t) for t in by_id.values()] for kind, by_id in self._by_kind.items()}
+            return self._version, tasks
+
+    @property
+    def version(self):
+        with self._lock:
+            self._evict(time.time())
+            return self._version
+
+    def changes(self, since):
+        """
+        Return (version, changed_tasks, removed_ids) for everything after `since`,
+        or None when `since` predates the remembered tombstones and a full
+        snapshot is required.
+        """
+        with self._lock:
+            self._evict(time.time())
+            if since > self._version or since < self._removed_floor:
+                return None
+            changed = []
+            for task in reversed(self._tasks.values()):
+                if task["version"] <= since:
+                    break
+                changed.append(dict(task))
+            changed.reverse()
+            removed = [task_id for version, task_id in self._removed if version > since]
+            return self._version, changed, removed
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tasks)
+
+    def _bump(self):
+        self._version += 1
+        return self._version
+
+    def _notify(self, event, data):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(event, dict(data))
+        except Exception:
+            pass
+
+    def _evict(self, now):
+        # _finished is ordered by finish time, so the oldest entries are always first
+        while self._finished:
+            task_id, finished_at = next(iter(self._finished.items()))
+            too_many = self.max_finished is not None and len(self._finished) > self.max_finished
+            too_old = self.max_age is not None and now - finished_at > self.max_age
+            if not (too_many or too_old):
+                break
+            self._finished.popitem(last=False)
+            task = self._tasks.pop(task_id, None)
+            if task is not None:
+                self._forget(task)
+
+    def _forget(self, task):
+        task_id = task["id"]
+        self._by_kind.get(task["kind"], {}).pop(task_id, None)
+        if len(self._removed) == self._removed.maxlen:
+            self._removed_floor = self._removed[0][0]
+        self._removed.append((self._bump(), task_id))
+        self._notify("removed", {"id": task_id, "version": self._version})
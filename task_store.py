@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from task_registry import FINISHED_STATUSES, TaskRegistry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL DEFAULT '{}',
+    extra TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_kind ON tasks (kind, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_version ON tasks (version);
+CREATE INDEX IF NOT EXISTS idx_tasks_finished_at ON tasks (finished_at) WHERE finished_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS removed (
+    version INTEGER PRIMARY KEY,
+    task_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS owners (
+    owner TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0), ('removed_floor', 0);
+"""
+
+_COLUMNS = "id, kind, status, message, payload, extra, created_at, updated_at, version"
+
+
+class SQLiteTaskRegistry:
+    """
+    TaskRegistry backed by a SQLite database in WAL mode.
+
+    Every gunicorn worker opening the same file sees the same tasks, ids and
+    version counter, and history survives restarts. on_change only fires for
+    changes made by this process.
+
+    Unfinished tasks record the process that runs them, and each process
+    refreshes a heartbeat row every `heartbeat` seconds. Tasks whose owner
+    has missed three heartbeats (a restart or a crashed worker) are marked
+    "error" so retention can evict them.
+    """
+
+    def __init__(self, path, kinds, max_finished=200, max_age=None, max_tombstones=1000, on_change=None,
+                 heartbeat=10):
+        self.path = path
+        self.kinds = tuple(kinds)
+        self.max_finished = max_finished
+        self.max_age = max_age
+        self.max_tombstones = max_tombstones
+        self.on_change = on_change
+        self.heartbeat = heartbeat
+        # pids repeat across container restarts, so the owner id carries a random part
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._last_reap = 0.0
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if "owner" not in {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}:
+            conn.execute("ALTER TABLE tasks ADD COLUMN owner TEXT")
+        self._beat()
+        self._notify_reaped(self._reap_now())
+        self._stopped = threading.Event()
+        threading.Thread(target=self._heartbeat_loop, name="task-store-heartbeat", daemon=True).start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE takes the write lock up front so the version bump is atomic across processes
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _beat(self):
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO owners (owner, heartbeat) VALUES (?, ?)", (self.owner, time.time()))
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat):
+            try:
+                self._beat()
+            except sqlite3.Error:
+                pass
+
+    def _reap(self, conn, now):
+        """Mark unfinished tasks whose owner stopped heartbeating as errors; returns the updated tasks"""
+        cutoff = now - 3 * self.heartbeat
+        conn.execute("DELETE FROM owners WHERE heartbeat < ?", (cutoff,))
+        orphans = [r[0] for r in conn.execute(
+            "SELECT id FROM tasks WHERE finished_at IS NULL AND (owner IS NULL OR owner NOT IN (SELECT owner FROM owners))")]
+        for task_id in orphans:
+            conn.execute(
+                "UPDATE tasks SET status = 'error', message = 'worker exited', updated_at = ?, finished_at = ?, version = ? WHERE id = ?",
+                (now, now, self._bump(conn), task_id),
+            )
+        return [self._select(conn, "WHERE id = ?", (task_id,))[0] for task_id in orphans]
+
+    def _reap_now(self):
+        now = time.time()
+        self._last_reap = now
+        with self._write() as conn:
+            return self._reap(conn, now)
+
+    def _notify_reaped(self, tasks):
+        for task in tasks:
+            self._notify("task", task)
+
+    def _bump(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @staticmethod
+    def _row_to_task(row):
+        task_id, kind, status, message, payload, extra, created_at, updated_at, version = row
+        task = json.loads(extra)
+        task.update({
+            "id": task_id,
+            "kind": kind,
+            "status": status,
+            "payload": json.loads(payload),
+            "message": message,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "version": version,
+        })
+        return task
+
+    def _select(self, conn, where="", params=()):
+        rows = conn.execute(f"SELECT {_COLUMNS} FROM tasks {where}", params).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def create(self, kind, payload, status="running"):
+        now = time.time()
+        with self._write() as conn:
+            version = self._bump(conn)
+            cur = conn.execute(
+                "INSERT INTO tasks (kind, status, payload, created_at, updated_at, version, owner) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, status, json.dumps(payload), now, now, version, self.owner),
+            )
+            task = self._select(conn, "WHERE id = ?", (cur.lastrowid,))[0]
+            removed = self._evict(conn, now)
+        self._notify("task", task)
+        self._notify_removed(removed)
+        return task
+
+    def mark(self, task_id, status, message=None, **fields):
+        now = time.time()
+        with self._write() as conn:
+            row = conn.execute("SELECT message, extra FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            extra = json.loads(row[1])
+            extra.update(fields)
+            version = self._bump(conn)
+            conn.execute(
+                "UPDATE tasks SET status = ?, message = ?, extra = ?, updated_at = ?, finished_at = ?, version = ?, owner = ? WHERE id = ?",
+                (
+                    status,
+                    row[0] if message is None else message,
+                    json.dumps(extra),
+                    now,
+                    now if status in FINISHED_STATUSES else None,
+                    version,
+                    self.owner,
+                    task_id,
+                ),
+            )
+            task = self._select(conn, "WHERE id = ?", (task_id,))[0]
+            removed = self._evict(conn, now)
+        self._notify("task", task)
+        self._notify_removed(removed)
+        return task
+
+    def update(self, task_id, **fields):
+        with self._write() as conn:
+            row = conn.execute("SELECT extra FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            extra = json.loads(row[0])
+            extra.update(fields)
+            conn.execute(
+                "UPDATE tasks SET extra = ?, version = ? WHERE id = ?",
+                (json.dumps(extra), self._bump(conn), task_id),
+            )
+            task = self._select(conn, "WHERE id = ?", (task_id,))[0]
+        self._notify("task", task)
+        return task
+
+    def discard(self, task_id):
+        with self._write() as conn:
+            if conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount == 0:
+                return False
+            removed = [self._tombstone(conn, task_id)]
+        self._notify_removed(removed)
+        return True
+
+    def get(self, task_id):
+        tasks = self._select(self._conn(), "WHERE id = ?", (task_id,))
+        return tasks[0] if tasks else None
+
+    def by_kind(self, kind):
+        return self._select(self._conn(), "WHERE kind = ? ORDER BY id", (kind,))
+
+    def snapshot(self):
+        removed = self._evict_now()
+        conn = self._conn()
+        # one read transaction so the version matches the rows
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            rows = self._select(conn, "ORDER BY id")
+        finally:
+            conn.execute("COMMIT")
+        self._notify_removed(removed)
+        tasks = {kind: [] for kind in self.kinds}
+        for task in rows:
+            tasks.setdefault(task["kind"], []).append(task)
+        return version, tasks
+
+    @property
+    def version(self):
+        self._notify_removed(self._evict_now())
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def changes(self, since):
+        removed_now = self._evict_now()
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if since > meta["version"] or since < meta["removed_floor"]:
+                result = None
+            else:
+                changed = self._select(conn, "WHERE version > ? ORDER BY version", (since,))
+                removed = [r[0] for r in conn.execute("SELECT task_id FROM removed WHERE version > ? ORDER BY version", (since,))]
+                result = (meta["version"], changed, removed)
+        finally:
+            conn.execute("COMMIT")
+        self._notify_removed(removed_now)
+        return result
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def _evict_now(self):
+        # reads also reap orphaned tasks, at most once per heartbeat interval
+        if time.time() - self._last_reap >= self.heartbeat:
+            self._notify_reaped(self._reap_now())
+        if self.max_age is None:
+            return []
+        with self._write() as conn:
+            return self._evict(conn, time.time())
+
+    def _evict(self, conn, now):
+        doomed = []
+        if self.max_age is not None:
+            doomed += [r[0] for r in conn.execute(
+                "SELECT id FROM tasks WHERE finished_at IS NOT NULL AND finished_at < ?", (now - self.max_age,))]
+        if self.max_finished is not None:
+            doomed += [r[0] for r in conn.execute(
+                "SELECT id FROM tasks WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT -1 OFFSET ?",
+                (self.max_finished,))]
+        removed = []
+        for task_id in dict.fromkeys(doomed):
+            conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            removed.append(self._tombstone(conn, task_id))
+        return removed
+
+    def _tombstone(self, conn, task_id):
+        version = self._bump(conn)
+        conn.execute("INSERT INTO removed (version, task_id) VALUES (?, ?)", (version, task_id))
+        stale = conn.execute(
+            "SELECT version FROM removed ORDER BY version DESC LIMIT 1 OFFSET ?", (self.max_tombstones,)).fetchone()
+        if stale is not None:
+            conn.execute("DELETE FROM removed WHERE version <= ?", (stale[0],))
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'removed_floor'", (stale[0],))
+        return {"id": task_id, "version": version}
+
+    def _notify(self, event, data):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(event, data)
+        except Exception:
+            pass
+
+    def _notify_removed(self, removed):
+        for data in removed:
+            self._notify("removed", data)
+
+
+def open_registry(kinds, path=None, **options):
+    """Return a SQLiteTaskRegistry when a database path is given, else the in-memory TaskRegistry"""
+    if path:
+        return SQLiteTaskRegistry(path, kinds, **options)
+    return TaskRegistry(kinds, **options)
@@ -0,0 +1,56 @@
+import os
+import logging
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.keys import Keys
+
+from metrics import REGISTRY, Counter
+
+logger = logging.getLogger("linkedin_agent")
+
+TEXT_INSERTS = REGISTRY.register(Counter(
+    "linkedin_text_inserts_total",
+    "Editor text insertions by the path that actually entered the text",
+    ("mode",),
+))
+
+# execCommand('insertText') goes through the browser's own editing pipeline, so the editor sees
+# the same beforeinput/input events as typing and enables its Post/Send button. Writing the DOM
+# directly instead is not attempted: editors with their own model ignore it, and reading the DOM
+# back would report success anyway. Returns whether execCommand inserted the text, so a refusal
+# falls through to typing.
+_INSERT_SCRIPT = """
+const [el, text] = arguments;
+const squash = s => (s || '').replace(/\\s+/g, ' ').trim();
+const current = () => ('value' in el && el.tagName !== 'DIV') ? el.value : el.innerText;
+el.focus();
+if (!document.execCommand('selectAll', false, null) || !document.execCommand('insertText', false, text)) {
+    return false;
+}
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return squash(current()) === squash(text);
+"""
+
+
+def insert_text(driver, element, text, mode=None):
+    """
+    Replace the contents of an editor with text in one operation.
+
+    Falls back to clearing the field and typing it key by key when the
+    browser refuses execCommand('insertText') or the text does not land, or when mode (default: TEXT_INPUT_MODE, "bulk")
+    is "keys". Returns the mode that was used.
+    """
+    mode = mode or os.environ.get("TEXT_INPUT_MODE", "bulk")
+    if mode == "bulk":
+        try:
+            if driver.execute_script(_INSERT_SCRIPT, element, text):
+                TEXT_INSERTS.inc(mode="bulk")
+                return "bulk"
+            logger.warning("Bulk text insert did not take, typing instead")
+        except WebDriverException as e:
+            logger.warning(f"Bulk text insert failed, typing instead: {e}")
+    element.send_keys(Keys.CONTROL + "a")
+    element.send_keys(Keys.DELETE)
+    element.send_keys(text)
+    TEXT_INSERTS.inc(mode="keys")
+    return "keys"
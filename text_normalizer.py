@@ -0,0 +1,39 @@
+import re
+import unicodedata
+
+# typographic punctuation LinkedIn's editor and ChromeDriver handle badly, mapped to ASCII.
+# Applied with str.replace: str.translate does a dict lookup per character on non-ASCII
+# text and measured ~6x slower on a typical draft (bench_normalize.py)
+_PUNCTUATION = {
+    "“": '"', "”": '"',   # smart double quotes
+    "‘": "'", "’": "'",   # smart single quotes / apostrophe
+    "—": "-", "–": "-",   # em / en dash
+    "…": "...",           # ellipsis
+}
+_PUNCTUATION_CHARS = re.compile("[" + "".join(_PUNCTUATION) + "]")
+
+# ChromeDriver's send_keys only supports the Basic Multilingual Plane (this is where emoji live)
+_NON_BMP = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def normalize(text):
+    """
+    Make post text safe to type into LinkedIn: drop characters outside the
+    BMP, NFKD-normalize, map smart quotes, dashes and ellipses to ASCII and
+    strip surrounding whitespace. Idempotent; ASCII text takes a fast path.
+    """
+    if text.isascii():
+        return text.strip()
+    text = _NON_BMP.sub("", text)
+    if not unicodedata.is_normalized("NFKD", text):
+        text = unicodedata.normalize("NFKD", text)
+    if _PUNCTUATION_CHARS.search(text):
+        for char, replacement in _PUNCTUATION.items():
+            text = text.replace(char, replacement)
+    return text.strip()
+
+
+def normalize_many(texts):
+    """normalize() over an iterable of drafts, returned as a list"""
+    _normalize = normalize
+    return [_normalize(text) for text in texts]